@@ -0,0 +1,8 @@
+"""Benchmarks offline del ETL: hojas sintéticas, dobles en memoria de
+Google Sheets y Supabase, y un runner que guarda resultados comparables.
+
+Uso (desde la raíz del repositorio):
+
+    python -m benchmarks.run --rows 1000 100000
+    python -m benchmarks.run --rows 1000 100000 --compare benchmarks/results/<base>.json
+"""
@@ -0,0 +1,229 @@
+import re
+import threading
+import time
+
+# =========================
+# GOOGLE SHEETS EN MEMORIA
+# =========================
+_A1_RE = re.compile(r"^([A-Z]*)(\d*)(?::([A-Z]*)(\d*))?$")
+
+
+def _column_index(letters):
+    n = 0
+    for ch in letters:
+        n = n * 26 + ord(ch) - 64
+    return n - 1
+
+
+def _split_range(a1):
+    """`'Hoja'!C3:C` -> ("Hoja", "C3:C"); sin `!` el rango es la hoja completa."""
+    match = re.match(r"^'((?:[^']|'')*)'(?:!(.*))?$", a1)
+    if match:
+        return match.group(1).replace("''", "'"), match.group(2)
+    name, _, rng = a1.partition("!")
+    return name, rng or None
+
+
+def _trim(values):
+    """Recortar celdas vacías al final de cada fila y filas vacías al final,
+    como hace la API de Sheets.
+    """
+    out = []
+    for row in values:
+        end = len(row)
+        while end and row[end - 1] == "":
+            end -= 1
+        out.append(row[:end])
+    while out and not out[-1]:
+        out.pop()
+    return out
+
+
+class FakeWorksheet:
+    """Doble de `gspread.Worksheet` con los métodos que usa el ETL."""
+
+    def __init__(self, title, values):
+        self.title = title
+        self._values = values
+
+    def get_all_values(self):
+        width = max((len(row) for row in self._values), default=0)
+        return [list(row) + [""] * (width - len(row)) for row in self._values]
+
+
+class FakeSpreadsheet:
+    """Doble de `gspread.Spreadsheet`: `values_batch_get` resuelve rangos A1
+    sobre matrices en memoria. `latency` simula la demora por llamada.
+    """
+
+    def __init__(self, sheet_id, sheets, latency=0.0):
+        self.id = sheet_id
+        self._sheets = sheets
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def worksheet(self, title):
+        return FakeWorksheet(title, self._sheets[title])
+
+    def worksheets(self):
+        return [FakeWorksheet(title, values) for title, values in self._sheets.items()]
+
+    def _range_values(self, a1):
+        name, rng = _split_range(a1)
+        values = self._sheets[name]
+        if not rng:
+            return values
+
+        match = _A1_RE.match(rng)
+        if match is None:
+            raise ValueError(f"Rango A1 no soportado: {a1}")
+        c1, r1, c2, r2 = match.groups()
+        single = match.group(3) is None and match.group(4) is None
+
+        first_row = int(r1) - 1 if r1 else 0
+        last_row = int(r2) if r2 else (first_row + 1 if single and r1 and c1 else len(values))
+        first_col = _column_index(c1) if c1 else 0
+        if c2:
+            last_col = _column_index(c2) + 1
+        elif single and c1:
+            last_col = first_col + 1
+        else:
+            last_col = None
+
+        return [row[first_col:last_col] for row in values[first_row:last_row]]
+
+    def values_batch_get(self, ranges, params=None):
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+        value_ranges = []
+        for a1 in ranges:
+            values = _trim(self._range_values(a1))
+            entry = {"range": a1, "majorDimension": "ROWS"}
+            if values:
+                entry["values"] = values
+            value_ranges.append(entry)
+        return {"valueRanges": value_ranges}
+
+
+class FakeGspreadClient:
+    """Doble de `gspread.Client`: `book` mapea sheet_id a {pestaña: valores}."""
+
+    def __init__(self, book, latency=0.0):
+        self.book = book
+        self.latency = latency
+        self.opened = {}
+
+    def open_by_key(self, key):
+        if self.latency:
+            time.sleep(self.latency)
+        spreadsheet = FakeSpreadsheet(key, self.book[key], self.latency)
+        self.opened[key] = spreadsheet
+        return spreadsheet
+
+
+# =========================
+# SUPABASE EN MEMORIA
+# =========================
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+
+
+class FakeQuery:
+    """Constructor de consultas con la interfaz de postgrest que usa el ETL."""
+
+    def __init__(self, client, table):
+        self.client = client
+        self.table = table
+        self.operation = None
+        self.payload = None
+        self.options = {}
+        self.filters = []
+
+    def insert(self, records, **options):
+        self.operation, self.payload, self.options = "insert", records, options
+        return self
+
+    def upsert(self, records, **options):
+        self.operation, self.payload, self.options = "upsert", records, options
+        return self
+
+    def select(self, columns="*", **options):
+        self.operation, self.payload, self.options = "select", columns, options
+        return self
+
+    def eq(self, column, value):
+        self.filters.append((column, {value}))
+        return self
+
+    def in_(self, column, values):
+        self.filters.append((column, set(values)))
+        return self
+
+    def execute(self):
+        return self.client._execute(self)
+
+
+class FakeSupabase:
+    """Doble del cliente de Supabase que guarda las filas en memoria.
+
+    `unique` (columnas de la clave única) hace que un insert duplicado
+    falle como en Postgres y que un upsert con `ignore_duplicates` omita las
+    filas existentes. `latency` simula la demora por request.
+    """
+
+    def __init__(self, unique=("business_id", "id_referenced", "date"), latency=0.0):
+        self.unique = unique
+        self.latency = latency
+        self.tables = {}
+        self.requests = 0
+        self._keys = {}
+        self._lock = threading.Lock()
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+    def _key(self, row):
+        return tuple(row.get(c) for c in self.unique)
+
+    def _execute(self, query):
+        with self._lock:
+            self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+        with self._lock:
+            rows = self.tables.setdefault(query.table, [])
+            keys = self._keys.setdefault(query.table, set())
+
+            if query.operation == "select":
+                found = [
+                    r for r in rows
+                    if all(r.get(column) in values for column, values in query.filters)
+                ]
+                if query.payload != "*":
+                    columns = [c.strip() for c in query.payload.split(",")]
+                    found = [{c: r.get(c) for c in columns} for r in found]
+                return FakeResponse(found)
+
+            records = query.payload if isinstance(query.payload, list) else [query.payload]
+            if self.unique:
+                batch_keys = [self._key(r) for r in records]
+                if query.operation == "insert":
+                    if len(set(batch_keys)) < len(batch_keys) or keys.intersection(batch_keys):
+                        raise Exception("duplicate key value violates unique constraint")
+                else:
+                    fresh = []
+                    for key, record in zip(batch_keys, records):
+                        if key not in keys:
+                            keys.add(key)
+                            fresh.append(record)
+                    records = fresh
+                keys.update(batch_keys)
+
+            rows.extend(records)
+            return FakeResponse(records)
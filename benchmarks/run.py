@@ -0,0 +1,220 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+# los módulos del ETL se importan como en producción (desde etl/), sin
+# snapshots ni cache de cabeceras en disco ni archivos de métricas
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "etl"))
+os.environ["SHEETS_SNAPSHOT_CACHE"] = "0"
+os.environ["SCHEMA_CACHE_PATH"] = ""
+os.environ["METRICS_REPORT_PATH"] = ""
+os.environ["METRICS_TEXTFILE_PATH"] = ""
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+import extract  # noqa: E402
+import load  # noqa: E402
+import scheduler  # noqa: E402
+import transform  # noqa: E402
+from sources import SOURCES  # noqa: E402
+
+from benchmarks.fakes import FakeGspreadClient, FakeSupabase, FakeWorksheet  # noqa: E402
+from benchmarks.synthetic import BOOK_LOCATIONS, LAYOUTS, generate_book  # noqa: E402
+
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+
+# =========================
+# MEDICIÓN
+# =========================
+def _measure(fn, repeat):
+    """Ejecutar `fn` `repeat` veces y retornar los tiempos en segundos."""
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - started)
+    return runs
+
+
+def _case(results, name, rows, fn, repeat, selected):
+    if selected and not any(s in name for s in selected):
+        return
+    runs = _measure(fn, repeat)
+    results.append({
+        "case": name,
+        "rows": rows,
+        "median": statistics.median(runs),
+        "min": min(runs),
+        "runs": runs,
+    })
+    print(f"{name:<28} {rows:>9} filas | mediana {statistics.median(runs):8.4f}s | mín {min(runs):8.4f}s")
+
+
+def _extract(source, year, month=None):
+    """Extraer una fuente del libro sintético instalado (mes o año completo)."""
+    # cada corrida lee de nuevo la hoja, como una ejecución del pipeline
+    extract.invalidate_gspread_cache()
+    sheet_id, worksheet = BOOK_LOCATIONS[source["name"]]
+    if month is None:
+        start = pd.Timestamp(year=year, month=1, day=1)
+        return extract.extract_source_range(
+            source, sheet_id, worksheet, start, start + pd.DateOffset(years=1)
+        )
+    return extract.extract_source(source, sheet_id, worksheet, year, month)
+
+
+def run_suite(rows_list, repeat, year, month, selected=None):
+    results = []
+    for n_rows in rows_list:
+        print(f"--- Generando hojas sintéticas: {n_rows} filas ---")
+        book = generate_book(n_rows, year=year)
+        extract.set_gspread_client_factory(lambda: FakeGspreadClient(book))
+
+        # lectura completa + registros robustos por disposición
+        for layout in LAYOUTS:
+            sheet_id, worksheet = BOOK_LOCATIONS[layout]
+            ws = FakeWorksheet(worksheet, book[sheet_id][worksheet])
+            _case(results, f"records_robust[{layout}]", n_rows,
+                  lambda ws=ws: extract.get_all_records_robust(ws), repeat, selected)
+
+        # motor de extracción: un mes (como la corrida mensual) y el año completo
+        frames = {}
+        for source in SOURCES:
+            _case(results, f"extract_month[{source['name']}]", n_rows,
+                  lambda source=source: _extract(source, year, month), repeat, selected)
+            _case(results, f"extract_year[{source['name']}]", n_rows,
+                  lambda source=source: _extract(source, year), repeat, selected)
+            frames[source["name"]] = _extract(source, year)
+
+        # transformación de cada fuente sobre el año completo
+        transformed = {}
+        for source in SOURCES:
+            df = frames[source["name"]]
+            _case(results, f"transform[{source['name']}]", n_rows,
+                  lambda df=df, source=source: transform.transform_source(df, source),
+                  repeat, selected)
+            transformed[source["name"]] = transform.transform_source(df, source)
+
+        consolidated = transform.concat_frames([transformed[s["name"]] for s in SOURCES])
+        _case(results, "concat", len(consolidated),
+              lambda: transform.concat_frames([transformed[s["name"]] for s in SOURCES]),
+              repeat, selected)
+
+        def serialize():
+            payload = load.serialize_columns(consolidated)
+            return load.records_slice(payload, 0, len(consolidated))
+
+        _case(results, "serialize", len(consolidated), serialize, repeat, selected)
+
+        def load_fake():
+            load.set_supabase_client(FakeSupabase())
+            return load.load(consolidated)
+
+        _case(results, "load_fake", len(consolidated), load_fake, repeat, selected)
+
+    extract.set_gspread_client_factory(None)
+    load.set_supabase_client(None)
+    return results
+
+
+# =========================
+# RESULTADOS
+# =========================
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def save_results(results, args, output_dir):
+    now = datetime.now(timezone.utc)
+    commit = _git_commit()
+    data = {
+        "created_at": now.isoformat(),
+        "commit": commit,
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "rows": args.rows,
+        "repeat": args.repeat,
+        "results": results,
+    }
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, f"{now:%Y%m%dT%H%M%S}_{commit or 'nocommit'}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    print(f"Resultados guardados en {path}")
+    return path
+
+
+def compare(results, baseline_path, threshold):
+    """Comparar medianas contra un resultado guardado. Retorna la cantidad
+    de casos más lentos que `1 + threshold` veces la línea base.
+    """
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    base = {(r["case"], r["rows"]): r for r in baseline["results"]}
+
+    print(f"--- Comparación contra {baseline_path} (commit {baseline.get('commit')}) ---")
+    regressions = 0
+    for r in results:
+        ref = base.get((r["case"], r["rows"]))
+        if ref is None:
+            continue
+        ratio = r["median"] / ref["median"] if ref["median"] > 0 else float("inf")
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  <-- REGRESIÓN"
+            regressions += 1
+        elif ratio < 1 - threshold:
+            flag = "  mejora"
+        print(f"{r['case']:<28} {r['rows']:>9} | base {ref['median']:8.4f}s | "
+              f"actual {r['median']:8.4f}s | x{ratio:5.2f}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks offline del ETL")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="filas de datos por hoja sintética (1k a 1M)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--cases", nargs="*", help="solo casos que contengan estos textos")
+    parser.add_argument("--year", type=int, default=2024)
+    parser.add_argument("--month", type=int, default=3)
+    parser.add_argument("--output", default=RESULTS_DIR)
+    parser.add_argument("--no-save", action="store_true")
+    parser.add_argument("--compare", help="archivo de resultados base para comparar")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="tolerancia relativa antes de marcar una regresión")
+    args = parser.parse_args(argv)
+
+    # los logs del ETL no forman parte de la salida del benchmark y los
+    # backends en memoria no tienen cuota
+    logging.disable(logging.CRITICAL)
+    scheduler.set_rate_limiting(False)
+
+    results = run_suite(args.rows, args.repeat, args.year, args.month, args.cases)
+    if not args.no_save:
+        save_results(results, args, args.output)
+    if args.compare:
+        return 1 if compare(results, args.compare, args.threshold) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,167 @@
+import numpy as np
+import pandas as pd
+
+# =========================
+# GENERADOR DE HOJAS SINTÉTICAS
+# =========================
+# Matrices de valores con la forma que retorna Google Sheets (todo texto):
+# fechas seriales y en texto mezcladas, celdas y filas vacías, cabeceras
+# duplicadas o vacías (col_N) y variantes de escritura de los métodos de pago.
+
+LAYOUTS = ("PC", "PI", "PI2", "PI3")
+
+GOOGLE_EPOCH = pd.Timestamp("1899-12-30")
+
+PAYMENT_METHODS = [
+    "Yape", "YAPE ", " plin", "Plin", "BCP", "bcp", "BBVA", "Interbank",
+    "Banco de la Nación", "Scotiabank", "Tarjeta Link", "Paypal", "PayPal",
+    "Banco de México", "Banco de Ecuador", "Banco de Chile", "Otros",
+    "Transferencia", "",
+]
+
+STATUSES = ["ENVIADO", "enviado ", "Enviado", "PENDIENTE", "CANCELADO", ""]
+
+# proporción de filas completamente vacías intercaladas
+BLANK_ROW_RATE = 0.03
+
+
+def _dates(rng, n, year, dayfirst):
+    """Fechas del año como mezcla de seriales (enteros y con hora), texto
+    ISO, texto día/mes (o mes/día) y algunas vacías o inválidas.
+    """
+    days = rng.integers(0, 365, n)
+    stamps = pd.Timestamp(year=year, month=1, day=1) + pd.to_timedelta(days, unit="D")
+    serial = (stamps - GOOGLE_EPOCH).days.to_numpy()
+
+    slash = "%d/%m/%Y" if dayfirst else "%m/%d/%Y"
+    variants = np.array([
+        serial.astype(str),
+        (serial + rng.random(n).round(4)).astype(str),
+        stamps.strftime("%Y-%m-%d").to_numpy(dtype=str),
+        stamps.strftime(slash).to_numpy(dtype=str),
+    ])
+    choice = rng.choice(4, n, p=[0.45, 0.05, 0.2, 0.3])
+    out = variants[choice, np.arange(n)].astype(object)
+
+    noise = rng.random(n)
+    out[noise < 0.02] = ""
+    out[(noise >= 0.02) & (noise < 0.025)] = "pendiente"
+    return out
+
+
+def _amounts(rng, n):
+    cents = rng.integers(1000, 90000, n)
+    out = np.char.mod("%.2f", cents / 100).astype(object)
+    whole = rng.random(n) < 0.3
+    out[whole] = (cents[whole] // 100).astype(str)
+    out[rng.random(n) < 0.01] = ""
+    return out
+
+
+def _choice(rng, values, n):
+    return np.array(values, dtype=object)[rng.integers(0, len(values), n)]
+
+
+def _ids(prefix, n):
+    return np.char.add(prefix, np.arange(1, n + 1).astype(str)).astype(object)
+
+
+def _matrix(header_rows, width, columns, n, rng):
+    """Armar la matriz: filas de cabecera, `columns` ({índice: valores})
+    en un ancho fijo y filas vacías intercaladas.
+    """
+    empty = np.full(n, "", dtype=object)
+    data = [columns.get(j, empty) for j in range(width)]
+    rows = [list(row) for row in zip(*(col.tolist() for col in data))]
+
+    blank = np.flatnonzero(rng.random(n) < BLANK_ROW_RATE)
+    for i in blank:
+        rows[i] = [""] * width
+
+    return [list(h) + [""] * (width - len(h)) for h in header_rows] + rows
+
+
+def generate(layout, n_rows, seed=0, year=2024):
+    """Matriz de valores sintética de `n_rows` filas de datos con la
+    disposición de la hoja `layout` (PC, PI, PI2 o PI3).
+    """
+    rng = np.random.default_rng(seed)
+    n = n_rows
+
+    if layout == "PC":
+        header = ["IdPedido", "Cliente", "Estado", "fecha entrega", "TotalPedido",
+                  "MetodoPago", "Notas", "Notas"]
+        columns = {
+            0: _ids("", n),
+            1: _choice(rng, ["Ana", "Luis", "María", "José", ""], n),
+            2: _choice(rng, STATUSES, n),
+            3: _dates(rng, n, year, dayfirst=False),
+            4: _amounts(rng, n),
+            5: _choice(rng, PAYMENT_METHODS, n),
+            7: _choice(rng, ["", "", "regalo", "cambio de talla"], n),
+        }
+        return _matrix([header], len(header), columns, n, rng)
+
+    if layout == "PI":
+        header = ["CODIGO_PAGO", "ALUMNO", "FECHA_P", "MONTO_P", "METODO_P",
+                  "ALUMNO", "OBS"]
+        columns = {
+            0: _ids("PI-", n),
+            1: _choice(rng, ["Ana", "Luis", "María", "José"], n),
+            2: _dates(rng, n, year, dayfirst=True),
+            3: _amounts(rng, n),
+            4: _choice(rng, PAYMENT_METHODS, n),
+            6: _choice(rng, ["", "beca", "cuota 2"], n),
+        }
+        return _matrix([header], len(header), columns, n, rng)
+
+    if layout == "PI2":
+        # fila inicial vacía y cabecera dispersa: las columnas usadas son col_N
+        header = ["Nombre", "", "", "", "", "Curso", "", ""]
+        columns = {
+            0: _choice(rng, ["Ana", "Luis", "María", "José"], n),
+            2: _ids("M-", n),
+            3: _amounts(rng, n),
+            4: _choice(rng, PAYMENT_METHODS, n),
+            5: _choice(rng, ["Excel", "Power BI", "SQL"], n),
+            7: _dates(rng, n, year, dayfirst=True),
+        }
+        return _matrix([[], header], len(header), columns, n, rng)
+
+    if layout == "PI3":
+        header = ["Nombre", "", "", "", "", "Curso"] + [""] * 19
+        columns = {
+            0: _choice(rng, ["Ana", "Luis", "María", "José"], n),
+            5: _choice(rng, ["Excel", "Power BI", "SQL"], n),
+            11: _ids("AM-", n),
+            22: _amounts(rng, n),
+            23: _dates(rng, n, year, dayfirst=True),
+            24: _choice(rng, PAYMENT_METHODS, n),
+        }
+        return _matrix([[], header], len(header), columns, n, rng)
+
+    raise ValueError(f"Disposición desconocida: {layout}")
+
+
+def generate_book(n_rows, seed=0, year=2024):
+    """Spreadsheets sintéticos para las cuatro fuentes, con los mismos ids
+    y nombres de pestaña que usa el benchmark (PI2 y PI3 comparten
+    spreadsheet, como en producción).
+    """
+    return {
+        "bench-pc": {"PC": generate("PC", n_rows, seed, year)},
+        "bench-pi": {"PI": generate("PI", n_rows, seed + 1, year)},
+        "bench-matricula": {
+            "PI2": generate("PI2", n_rows, seed + 2, year),
+            "PI3": generate("PI3", n_rows, seed + 3, year),
+        },
+    }
+
+
+# ubicación (sheet_id, worksheet_name) de cada fuente en `generate_book`
+BOOK_LOCATIONS = {
+    "PC": ("bench-pc", "PC"),
+    "PI": ("bench-pi", "PI"),
+    "PI2": ("bench-matricula", "PI2"),
+    "PI3": ("bench-matricula", "PI3"),
+}
@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 import gspread
 import re
@@ -5,15 +6,65 @@ import unicodedata
 from google.oauth2.service_account import Credentials
 import json
 import os
+import threading
+import time
 from datetime import date
+from functools import lru_cache
+from itertools import zip_longest
 
-from logger import get_logger
+try:
+    from pandas.tseries.api import guess_datetime_format
+except ImportError:  # pandas < 2.2: solo en el módulo interno
+    from pandas._libs.tslibs.parsing import guess_datetime_format
+
+import metrics
+import scheduler
+import schema_cache
+import snapshot
+from sources import get_source
+from logger import get_logger, log_preview
 
 logger = get_logger("EXTRACT")
 
 SCOPES = ["https://www.googleapis.com/auth/spreadsheets.readonly"]
+if snapshot.SNAPSHOT_ENABLED:
+    # modifiedTime de Drive: validación de los snapshots locales
+    SCOPES.append("https://www.googleapis.com/auth/drive.metadata.readonly")
+
+# =========================
+# CACHE DE CLIENTE / SPREADSHEETS
+# =========================
+# Segundos que se reutiliza el cliente autorizado (y los spreadsheets abiertos
+# con él) antes de volver a autenticar. El token OAuth dura 1h.
+GSPREAD_CLIENT_TTL = int(os.getenv("GSPREAD_CLIENT_TTL", "3000"))
+
+_client_lock = threading.Lock()
+_client_cache = {"client": None, "created_at": 0.0}
+_spreadsheet_cache = {}
+# un lock por spreadsheet: open_by_key corre fuera de `_client_lock`
+_open_locks = {}
+# Constructor alternativo del cliente (ver `set_gspread_client_factory`)
+_client_factory = None
+
+
+def set_gspread_client_factory(factory):
+    """Usar `factory()` en lugar de las credenciales de servicio para crear
+    el cliente (p. ej. un backend en memoria para benchmarks). Con None se
+    restaura el cliente real. Invalida la cache.
+    """
+    global _client_factory
+    _client_factory = factory
+    invalidate_gspread_cache()
 
-def get_gspread_client():
+
+def _build_gspread_client():
+    if _client_factory is not None:
+        return _client_factory()
+    return service_account_client()
+
+
+def service_account_client():
+    """Cliente gspread autorizado con la cuenta de servicio del entorno."""
     credentials = Credentials.from_service_account_info(
         json.loads(os.getenv("GOOGLE_SERVICE_ACCOUNT_JSON")),
         scopes=SCOPES
@@ -21,22 +72,482 @@ def get_gspread_client():
     return gspread.authorize(credentials)
 
 
+def get_gspread_client():
+    """Retornar el cliente gspread autorizado, reutilizándolo mientras no
+    expire `GSPREAD_CLIENT_TTL`. Al renovarse se descartan los spreadsheets
+    abiertos con el cliente anterior.
+    """
+    with _client_lock:
+        now = time.monotonic()
+        client = _client_cache["client"]
+        if client is None or now - _client_cache["created_at"] > GSPREAD_CLIENT_TTL:
+            logger.info("Autenticando cliente de Google Sheets")
+            client = _build_gspread_client()
+            _client_cache["client"] = client
+            _client_cache["created_at"] = now
+            _spreadsheet_cache.clear()
+        return client
+
+
+def open_spreadsheet(sheet_id):
+    """Abrir un spreadsheet por id reutilizando el handle ya abierto."""
+    client = get_gspread_client()
+    with _client_lock:
+        spreadsheet = _spreadsheet_cache.get(sheet_id)
+        if spreadsheet is not None:
+            return spreadsheet
+        open_lock = _open_locks.setdefault(sheet_id, threading.Lock())
+
+    # la apertura (con sus reintentos) solo bloquea a quien pide el mismo id
+    with open_lock:
+        with _client_lock:
+            spreadsheet = _spreadsheet_cache.get(sheet_id)
+        if spreadsheet is not None:
+            return spreadsheet
+        spreadsheet = scheduler.call("sheets", client.open_by_key, sheet_id)
+        # open_by_key consulta los metadatos del spreadsheet
+        metrics.count("sheets")
+        with _client_lock:
+            # un handle del cliente anterior no se guarda si este se renovó
+            if _client_cache["client"] is client:
+                _spreadsheet_cache[sheet_id] = spreadsheet
+        return spreadsheet
+
+
+def invalidate_gspread_cache(sheet_id=None):
+    """Invalidar la cache. Con `sheet_id` solo se descarta ese spreadsheet;
+    sin argumentos se descarta también el cliente autorizado.
+    """
+    with _client_lock:
+        if sheet_id is not None:
+            _spreadsheet_cache.pop(sheet_id, None)
+            return
+        _spreadsheet_cache.clear()
+        _client_cache["client"] = None
+        _client_cache["created_at"] = 0.0
+
+    with _values_lock:
+        _planned_worksheets.clear()
+        _values_cache.clear()
+
+
+# =========================
+# LECTURA AGRUPADA DE HOJAS
+# =========================
+# Hojas que se leerán en la corrida, agrupadas por spreadsheet, para pedir
+# todas las de un mismo spreadsheet en una sola llamada `values:batchGet`.
+_values_lock = threading.Lock()
+_planned_worksheets = {}
+_values_cache = {}
+_sheet_locks = {}
+
+# Filas iniciales que se leen para ubicar la cabecera al proyectar columnas
+HEADER_SCAN_ROWS = int(os.getenv("HEADER_SCAN_ROWS", "10"))
+# Descargar solo las columnas que usa cada hoja (0 = hoja completa)
+SHEETS_COLUMN_PROJECTION = os.getenv("SHEETS_COLUMN_PROJECTION", "1") == "1"
+
+# Leer solo las filas nuevas de hojas con snapshot (hojas append-only)
+SHEETS_INCREMENTAL = os.getenv("SHEETS_INCREMENTAL", "0") == "1"
+
+def sheet_columns(name):
+    """Columnas a proyectar para una fuente registrada, o None si la
+    proyección está desactivada.
+    """
+    if not SHEETS_COLUMN_PROJECTION:
+        return None
+    return get_source(name)["columns"]
+
+
+def _a1_sheet(worksheet_name):
+    """Nombre de hoja citado para notación A1 (`'Hoja 1'`)."""
+    return "'" + str(worksheet_name).replace("'", "''") + "'"
+
+
+def _batch_get(spreadsheet, ranges):
+    """Leer varios rangos A1 en una sola llamada y retornar sus matrices
+    de valores en el mismo orden que `ranges`.
+    """
+    response = scheduler.call("sheets", spreadsheet.values_batch_get, ranges)
+    value_ranges = response.get("valueRanges", [])
+    tables = [vr.get("values", []) for vr in value_ranges]
+    # bytes de payload (aprox.): largo del texto de las celdas recibidas
+    nbytes = sum(
+        len(str(cell)) for values in tables for row in values for cell in row
+    ) if metrics.METRICS_COUNT_BYTES else 0
+    metrics.count("sheets", nbytes=nbytes)
+    return [_fill_gaps(values) for values in tables]
+
+
+def _fill_gaps(values):
+    """Completar filas al ancho máximo como hace `get_all_values`: la API
+    recorta las celdas vacías al final de cada fila, incluida la cabecera.
+    """
+    width = max((len(row) for row in values), default=0)
+    return [row + [""] * (width - len(row)) for row in values]
+
+
+def plan_worksheet_reads(worksheets):
+    """Registrar las hojas que se leerán en la corrida como tuplas
+    (sheet_id, worksheet_name[, columns]). La primera lectura de un
+    spreadsheet trae todas sus hojas planificadas en una sola llamada.
+    """
+    with _values_lock:
+        for sheet_id, worksheet_name, *columns in worksheets:
+            planned = _planned_worksheets.setdefault(sheet_id, {})
+            planned[worksheet_name] = columns[0] if columns else None
+
+
+def get_worksheet_table(sheet_id, worksheet_name, columns=None):
+    """Retornar `(headers, rows)` de una hoja: cabeceras únicas y filas de
+    datos. Con `columns` solo se descargan esas columnas (ver
+    `_fetch_tables`). Las hojas planificadas del mismo spreadsheet se leen
+    junto con esta.
+    """
+    with _values_lock:
+        sheet_lock = _sheet_locks.setdefault(sheet_id, threading.Lock())
+
+    with sheet_lock:
+        with _values_lock:
+            key = (sheet_id, worksheet_name)
+            if key in _values_cache:
+                # cada tabla se entrega una sola vez para liberar memoria
+                return _values_cache.pop(key)
+
+            reads = {worksheet_name: columns}
+            for name, cols in _planned_worksheets.pop(sheet_id, {}).items():
+                reads.setdefault(name, cols)
+
+        tables = _fetch_tables(sheet_id, reads)
+        if len(reads) > 1:
+            logger.info(
+                f"Lectura agrupada | Sheet: {sheet_id} | Hojas: {list(reads)}"
+            )
+
+        with _values_lock:
+            for name, table in tables.items():
+                if name != worksheet_name:
+                    _values_cache[(sheet_id, name)] = table
+
+        return tables[worksheet_name]
+
+
+def _fetch_tables(sheet_id, reads):
+    """Leer varias hojas de un spreadsheet. `reads` mapea worksheet_name a
+    la lista de columnas requeridas (o None para la hoja completa).
+
+    Sin proyección: una sola llamada con todas las hojas completas.
+    Con proyección: una llamada con las hojas completas y las primeras
+    `HEADER_SCAN_ROWS` filas de las proyectadas, y otra con solo los rangos
+    A1 de las columnas requeridas (desde la fila siguiente a la cabecera).
+    Las hojas sin cambios se sirven desde el snapshot local (ver `snapshot`).
+    """
+    spreadsheet = open_spreadsheet(sheet_id)
+    # se consulta antes de leer: una edición durante la lectura deja el
+    # snapshot con una fecha anterior y se vuelve a leer en la próxima corrida
+    modified = _modified_time(spreadsheet) if snapshot.SNAPSHOT_ENABLED else None
+
+    tables = _tables_from_snapshots(spreadsheet, sheet_id, reads, modified)
+    reads = {name: cols for name, cols in reads.items() if name not in tables}
+    if not reads:
+        return tables
+
+    full = [name for name, cols in reads.items() if not cols]
+    projected = [(name, cols) for name, cols in reads.items() if cols]
+
+    matrices = _batch_get(
+        spreadsheet,
+        [_a1_sheet(name) for name in full]
+        + [f"{_a1_sheet(name)}!1:{HEADER_SCAN_ROWS}" for name, _ in projected]
+    )
+    heads = dict(zip([name for name, _ in projected], matrices[len(full):]))
+
+    # posición de los datos de cada hoja, para el snapshot
+    layout = {}
+
+    def read_full(name, values):
+        tables[name] = _split_header(values)
+        header_idx = _header_index(values) or 0
+        layout[name] = {
+            "first_row": header_idx + 2,
+            "header_raw": _trim_row(values[header_idx]) if values else [],
+            "letters": None,
+        }
+
+    for name, values in zip(full, matrices[:len(full)]):
+        read_full(name, values)
+
+    ranges = []
+    pending = []
+    for name, cols in projected:
+        head = heads[name]
+        plan = _projection_plan(head, cols)
+        if plan is None:
+            logger.warning(
+                f"No se pudo proyectar columnas {cols} en '{name}'; se lee la hoja completa"
+            )
+            pending.append((name, None, len(ranges), 1))
+            ranges.append(_a1_sheet(name))
+            continue
+
+        headers, letters, header_idx = plan
+        first_row = header_idx + 2
+        layout[name] = {
+            "first_row": first_row,
+            "header_raw": _trim_row(head[header_idx]),
+            "letters": letters,
+        }
+        pending.append((name, headers, len(ranges), len(letters)))
+        ranges.extend(f"{_a1_sheet(name)}!{c}{first_row}:{c}" for c in letters)
+
+    if ranges:
+        matrices = _batch_get(spreadsheet, ranges)
+        for name, headers, start, count in pending:
+            if headers is None:
+                read_full(name, matrices[start])
+                continue
+
+            tables[name] = (headers, _rows_from_columns(matrices[start:start + count]))
+
+    # registrar la cabecera vigente (loguea las diferencias si cambió)
+    for name, info in layout.items():
+        schema_cache.observe(sheet_id, name, info["header_raw"])
+
+    # sin modifiedTime no hay cómo validar un snapshot: no se guarda
+    if modified is not None:
+        for name, cols in reads.items():
+            snapshot.save(
+                sheet_id, name, cols, *tables[name], modified, **layout[name]
+            )
+
+    return tables
+
+
+def _rows_from_columns(matrices):
+    """Unir matrices de una columna (rangos `C2:C`) en filas."""
+    columns = [[row[0] if row else "" for row in m] for m in matrices]
+    return [list(r) for r in zip_longest(*columns, fillvalue="")]
+
+
+def _trim_row(row):
+    """Fila sin las celdas vacías del final (como la retorna la API)."""
+    row = list(row)
+    while row and row[-1] == "":
+        row.pop()
+    return row
+
+
+def _modified_time(spreadsheet):
+    """`modifiedTime` de Drive del spreadsheet (cambia con cualquier edición
+    de cualquier hoja), o None si no se puede consultar.
+    """
+    getter = getattr(spreadsheet, "get_lastUpdateTime", None)
+    if getter is None:
+        return None
+    try:
+        return scheduler.call("drive", getter)
+    except Exception as e:
+        logger.warning(f"No se pudo consultar modifiedTime; se omiten los snapshots ({e})")
+        return None
+    finally:
+        metrics.count("drive")
+
+
+def _tables_from_snapshots(spreadsheet, sheet_id, reads, modified):
+    """Retornar las tablas que pueden servirse desde snapshots locales.
+    Un snapshot sirve si el `modifiedTime` del spreadsheet no cambió desde
+    que se guardó (o si es más reciente que SNAPSHOT_TRUST_SECONDS). Con
+    `SHEETS_INCREMENTAL` las hojas que cambiaron se completan leyendo solo
+    las filas posteriores a su marca de agua.
+    """
+    tables = {}
+    if modified is None:
+        return tables
+
+    changed = {}
+    for name, cols in reads.items():
+        snap = snapshot.load(sheet_id, name, cols)
+        if snap is None:
+            continue
+        if snap["modified"] == modified:
+            tables[name] = (snap["headers"], snap["rows"])
+            snapshot.touch(sheet_id, name, cols)
+            logger.info(f"Snapshot local sin cambios | Hoja: {name}")
+        elif snapshot.is_trusted(snap):
+            tables[name] = (snap["headers"], snap["rows"])
+            logger.info(f"Snapshot local reciente | Hoja: {name}")
+        else:
+            changed[name] = snap
+
+    if SHEETS_INCREMENTAL and changed:
+        for name, table in _incremental_tables(spreadsheet, changed).items():
+            tables[name] = table
+            snapshot.save(
+                sheet_id, name, reads[name], *table, modified,
+                first_row=changed[name]["first_row"],
+                header_raw=changed[name]["header_raw"],
+                letters=changed[name]["letters"],
+            )
+
+    return tables
+
+
+def _incremental_tables(spreadsheet, snaps):
+    """Completar snapshots leyendo solo desde su marca de agua.
+    En una llamada se traen, por hoja, la fila de cabecera, la columna de
+    control (primera columna leída) hasta la marca de agua y las filas desde
+    la última vista (ancla) hasta el final. Si la cabecera cambió, o el hash
+    del ancla o de la columna de control no coincide (fila editada, insertada
+    o eliminada), la hoja se omite y se lee completa. Las ediciones en otras
+    columnas sobre la marca de agua no se detectan: usar solo en hojas
+    append-only.
+    """
+    ranges = []
+    pending = []
+    for name, snap in snaps.items():
+        watermark = snap.get("watermark")
+        if not watermark or "prefix" not in watermark:
+            continue
+
+        sheet = _a1_sheet(name)
+        first_row = snap["first_row"]
+        header_row = first_row - 1
+        anchor = watermark["row"]
+        letters = snap["letters"]
+        check = letters[0] if letters else "A"
+        if letters is None:
+            last = _col_letter(max(len(snap["headers"]), 1) - 1)
+            data_ranges = [f"{sheet}!A{anchor}:{last}"]
+        else:
+            data_ranges = [f"{sheet}!{c}{anchor}:{c}" for c in letters]
+
+        pending.append((name, snap, len(ranges), len(data_ranges)))
+        ranges.append(f"{sheet}!{header_row}:{header_row}")
+        # sin filas sobre el ancla se repite la cabecera (se ignora)
+        ranges.append(
+            f"{sheet}!{check}{first_row}:{check}{anchor - 1}"
+            if anchor > first_row else f"{sheet}!{header_row}:{header_row}"
+        )
+        ranges.extend(data_ranges)
+
+    if not ranges:
+        return {}
+
+    matrices = _batch_get(spreadsheet, ranges)
+    tables = {}
+    for name, snap, start, count in pending:
+        header = matrices[start]
+        if _trim_row(header[0] if header else []) != snap["header_raw"]:
+            logger.info(f"Cabecera modificada, lectura completa | Hoja: {name}")
+            continue
+
+        watermark = snap["watermark"]
+        n_prefix = watermark["row"] - snap["first_row"]
+        prefix = [row[0] if row else "" for row in matrices[start + 1]]
+        if snapshot.prefix_hash(prefix, n_prefix) != watermark["prefix"]:
+            logger.info(f"Filas previas modificadas, lectura completa | Hoja: {name}")
+            continue
+
+        data = matrices[start + 2:start + 2 + count]
+        rows = data[0] if snap["letters"] is None else _rows_from_columns(data)
+        anchor_row = rows[0] if rows else []
+        if snapshot.row_hash(anchor_row) != watermark["hash"]:
+            logger.info(f"Fila ancla modificada, lectura completa | Hoja: {name}")
+            continue
+
+        width = len(snap["headers"])
+        new_rows = [row + [""] * (width - len(row)) for row in rows[1:]]
+        tables[name] = (snap["headers"], snap["rows"] + new_rows)
+        logger.info(
+            f"Lectura incremental | Hoja: {name} | "
+            f"Desde fila {snap['watermark']['row'] + 1} | Nuevas: {len(new_rows)}"
+        )
+
+    return tables
+
+
+def _col_letter(idx):
+    """Índice de columna 0-based a letra A1 (0 -> A, 26 -> AA)."""
+    letters = ""
+    idx += 1
+    while idx:
+        idx, rem = divmod(idx - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+
+def _projection_plan(head_values, columns):
+    """Ubicar las columnas requeridas en las filas iniciales de la hoja.
+    Retorna `(headers, letras de columna, índice de la cabecera)` o None si
+    no se pueden resolver todas (en ese caso se lee la hoja completa).
+    """
+    header_idx = _header_index(head_values)
+    if header_idx is None:
+        return None
+
+    unique = _unique_headers(head_values[header_idx])
+    indices = schema_cache.resolve(
+        unique, ["projection", columns], lambda: _projection_indices(unique, columns)
+    )
+    if indices is None:
+        return None
+
+    headers = [unique[i] if i < len(unique) else f"col_{i}" for i in indices]
+    letters = [_col_letter(i) for i in indices]
+    return headers, letters, header_idx
+
+
+def _projection_indices(unique, columns):
+    """Índices de `columns` en la cabecera `unique`, o None si falta alguna."""
+    by_name = {h: i for i, h in enumerate(unique)}
+    by_norm = {}
+    for i, h in enumerate(unique):
+        by_norm.setdefault(_normalize_col_name(h), i)
+
+    indices = []
+    for col in columns:
+        idx = by_name.get(col)
+        for cand in CANONICAL_COLUMNS.get(col, [col]):
+            if idx is not None:
+                break
+            idx = by_norm.get(_normalize_col_name(cand))
+        if idx is None:
+            # columnas sin cabecera más allá del ancho leído: col_{j}
+            m = re.fullmatch(r"col_(\d+)", col)
+            if m and int(m.group(1)) >= len(unique):
+                idx = int(m.group(1))
+        if idx is None:
+            return None
+        indices.append(idx)
+    return indices
+
+
 def get_all_records_robust(ws):
-    """Leer toda la hoja y construir registros robustos.
+    """Leer toda la hoja y construir registros robustos (ver `records_from_values`)."""
+    return records_from_values(scheduler.call("sheets", ws.get_all_values))
+
+
+def records_from_values(values):
+    """Construir registros robustos a partir de una matriz de valores.
     - Detecta la primera fila no vacía como encabezado.
     - Rellena encabezados vacíos con `col_{i}` y asegura nombres únicos.
     - Convierte cadenas numéricas a int/float para preservar seriales de fecha.
     - Omite filas completamente vacías.
     """
-    values = ws.get_all_values()
     if not values:
         return []
 
-    # encontrar la primera fila que parezca encabezado (alguna celda no vacía)
-    header_idx = next((i for i, r in enumerate(values) if any(str(c).strip() for c in r)), 0)
-    raw_headers = [str(h).strip() for h in values[header_idx]]
+    return records_from_rows(*_split_header(values))
+
+
+def _header_index(values):
+    """Índice de la primera fila que parezca encabezado (alguna celda no vacía)."""
+    return next((i for i, r in enumerate(values) if any(str(c).strip() for c in r)), None)
+
+
+def _unique_headers(header_row):
+    """Normalizar y hacer únicos los nombres de columnas."""
+    raw_headers = [str(h).strip() for h in header_row]
 
-    # normalizar y hacer únicos los nombres de columnas
     seen = {}
     headers = []
     for j, h in enumerate(raw_headers):
@@ -47,50 +558,109 @@ def get_all_records_robust(ws):
         else:
             seen[name] = 0
         headers.append(name)
+    return headers
+
+
+def _split_header(values):
+    """Separar una matriz de valores en `(headers, filas de datos)`."""
+    if not values:
+        return [], []
+
+    header_idx = _header_index(values) or 0
+    return _unique_headers(values[header_idx]), values[header_idx + 1 :]
+
 
-    data_rows = values[header_idx + 1 :]
-    records = []
+_INT_RE = re.compile(r"-?\d+")
+_FLOAT_RE = re.compile(r"-?\d+\.\d+")
+
+
+def _type_cell(cell):
+    """Tipar una celda: None si está vacía, int/float si es numérica
+    (para preservar seriales de fecha) o la cadena sin espacios.
+    """
+    if cell is None:
+        return None
+    s = str(cell).strip()
+    if s == "":
+        return None
+    if _INT_RE.fullmatch(s):
+        return int(s)
+    if _FLOAT_RE.fullmatch(s):
+        return float(s)
+    return s
+
+
+def _typed_columns(headers, data_rows):
+    """Tipar la matriz por columnas.
+    Cada columna se factoriza y solo sus valores distintos pasan por
+    `_type_cell`; el resultado se expande con los códigos. Retorna una lista
+    de arreglos object (uno por cabecera) y la máscara de filas no vacías.
+    """
     num_cols = len(headers)
+    if all(len(row) == num_cols for row in data_rows):
+        matrix = np.array(data_rows, dtype=object).reshape(len(data_rows), num_cols)
+    else:
+        # asegurar longitud (filas cortas -> None, columnas extra se descartan)
+        matrix = pd.DataFrame(data_rows, dtype=object).reindex(
+            columns=range(num_cols)
+        ).to_numpy(dtype=object)
 
-    for row in data_rows:
-        # asegurar longitud
-        row_extended = list(row) + [""] * max(0, num_cols - len(row))
-        rec = {}
-        for i, cell in enumerate(row_extended[:num_cols]):
-            if cell is None:
-                rec[headers[i]] = None
-                continue
-            s = str(cell).strip()
-            if s == "":
-                rec[headers[i]] = None
-                continue
+    columns = []
+    empty_rows = np.ones(len(matrix), dtype=bool)
+
+    for j in range(num_cols):
+        values, empty = _type_column(matrix[:, j])
+        columns.append(values)
+        empty_rows &= empty
+
+    return columns, ~empty_rows
+
+
+def _type_column(cells):
+    """Tipar una columna cruda. Retorna el arreglo object tipado y la
+    máscara de celdas vacías.
+    """
+    codes, uniques = pd.factorize(np.asarray(cells, dtype=object))
+    typed = [_type_cell(u) for u in uniques]
+    # el código -1 (celda None) toma el último elemento: None
+    typed_uniques = np.empty(len(typed) + 1, dtype=object)
+    typed_uniques[:-1] = typed
+    empty_uniques = np.array([v is None for v in typed] + [True])
+
+    return typed_uniques[codes], empty_uniques[codes]
 
-            # intentar convertir a número (int o float)
-            if re.fullmatch(r"-?\d+", s):
-                try:
-                    rec[headers[i]] = int(s)
-                    continue
-                except Exception:
-                    pass
-            if re.fullmatch(r"-?\d+\.\d+", s):
-                try:
-                    rec[headers[i]] = float(s)
-                    continue
-                except Exception:
-                    pass
-
-            # conservar string
-            rec[headers[i]] = s
-
-        # ignorar filas vacías
-        if all(v is None for v in rec.values()):
-            continue
 
-        records.append(rec)
+def frame_from_rows(headers, data_rows):
+    """Construir el DataFrame directamente desde las filas de datos, con
+    las mismas reglas de tipado que `records_from_rows`.
+    """
+    if not headers:
+        return pd.DataFrame()
+
+    columns, keep = _typed_columns(headers, data_rows)
+    df = pd.DataFrame(
+        {h: values[keep] for h, values in zip(headers, columns)}
+    )
+    # inferir dtypes como lo hace pd.DataFrame(records)
+    return df.infer_objects()
+
+
+def frame_from_values(values):
+    """Versión columnar de `records_from_values`: DataFrame desde la matriz."""
+    return frame_from_rows(*_split_header(values))
+
+
+def records_from_rows(headers, data_rows):
+    """Tipar filas de datos según `headers` y omitir filas vacías."""
+    if not headers:
+        return []
 
-    return records
+    columns, keep = _typed_columns(headers, data_rows)
+    kept = [values[keep].tolist() for values in columns]
+    return [dict(zip(headers, row)) for row in zip(*kept)]
 
 
+@lru_cache(maxsize=4096)
 def _normalize_col_name(name):
     s = str(name or "")
     s = unicodedata.normalize('NFKD', s)
@@ -104,8 +674,18 @@ def _normalize_col_name(name):
 def _find_column(df, candidates):
     """Buscar columna en df comparando nombres normalizados contra candidatos.
     Retorna el nombre original de la columna si se encuentra, o None.
+    `df` puede ser un DataFrame o la lista de nombres de columnas; el
+    resultado se guarda por huella de la cabecera (ver `schema_cache`).
     """
-    norm_map = { _normalize_col_name(c): c for c in df.columns }
+    columns = [str(c) for c in getattr(df, "columns", df)]
+    candidates = list(candidates)
+    return schema_cache.resolve(
+        columns, ["find", candidates], lambda: _match_column(columns, candidates)
+    )
+
+
+def _match_column(columns, candidates):
+    norm_map = { _normalize_col_name(c): c for c in columns }
     for cand in candidates:
         n = _normalize_col_name(cand)
         if n in norm_map:
@@ -119,216 +699,217 @@ def _find_column(df, candidates):
     return None
 
 
-def normalize_columns(df):
-    """Renombrar columnas del dataframe a nombres canónicos cuando sea posible.
-    Evita KeyError al referirse a nombres esperados en el código.
-    """
-    mapping = {
-        "Fecha de pago": ["Fecha de pago", "fecha de pago", "fecha_pago", "fechadepago", "fechapago"],
-        "FECHA_P": ["FECHA_P", "FECHA P", "fecha_p", "fecha p", "fecha_p"],
-        "FechaEntrega": ["FechaEntrega", "fecha entrega", "fecha_entrega", "fechaentrega"],
-        "Estado": ["Estado", "estado", "ESTADO"],
-    }
-
-    for canonical, candidates in mapping.items():
-        found = _find_column(df, candidates)
-        if found and found != canonical:
-            try:
-                df.rename(columns={found: canonical}, inplace=True)
-            except Exception:
-                logger.debug(f"No se pudo renombrar {found} -> {canonical}")
+# Variantes conocidas de los nombres canónicos de columnas
+CANONICAL_COLUMNS = {
+    "Fecha de pago": ["Fecha de pago", "fecha de pago", "fecha_pago", "fechadepago", "fechapago"],
+    "FECHA_P": ["FECHA_P", "FECHA P", "fecha_p", "fecha p", "fecha_p"],
+    "FechaEntrega": ["FechaEntrega", "fecha entrega", "fecha_entrega", "fechaentrega"],
+    "Estado": ["Estado", "estado", "ESTADO"],
+}
 
-    return df
 
-from datetime import date
-
-def extract_sheet_pc(sheet_id, worksheet_name, fuente, year, month):
-    logger.info(f"Extrayendo datos | Sheet: {sheet_id}")
-
-    target_year = year
-    target_month = month
-
-    # =========================
-    # CONEXIÓN GOOGLE SHEETS
-    # =========================
-    ws = (
-        get_gspread_client()
-        .open_by_key(sheet_id)
-        .worksheet(worksheet_name)
+def canonical_names(columns):
+    """Nombres de `columns` tras renombrar las variantes conocidas a sus
+    nombres canónicos (misma posición, misma longitud).
+    """
+    columns = [str(c) for c in columns]
+    return schema_cache.resolve(
+        columns, ["canonical", CANONICAL_COLUMNS], lambda: _canonical_names(columns)
     )
 
-    records = get_all_records_robust(ws)
-    df = pd.DataFrame(records)
-    logger.info(f"Registros totales extraídos: {len(df)}")
-
-    # =========================
-    # NORMALIZACIÓN BÁSICA
-    # =========================
-    df.columns = df.columns.str.strip()
-    df = normalize_columns(df)
-    logger.info(f"Cabeceras detectadas: {list(df.columns)}")
-
-    # intentar localizar columna de fecha (varias variantes posibles)
-    fecha_col = _find_column(df, ["Fecha de pago", "fecha_pago", "FechaPago", "Fecha", "fecha"])
-    if fecha_col is None:
-        logger.warning("No se encontró columna de 'Fecha de pago' en la hoja; se creará columna vacía 'Fecha de pago'.")
-        df["Fecha de pago"] = None
-        fecha_col = "Fecha de pago"
-
-    # =========================
-    # FILTRO POR ESTADO
-    # =========================
-    if "Estado" not in df.columns:
-        logger.warning("La columna 'Estado' no existe en la hoja")
-    else:
-        total_antes = len(df)
-        df = df[df["Estado"].str.upper().str.strip() == "ENVIADO"]
-        logger.info(
-            f"Filtro Estado=ENVIADO | "
-            f"Antes: {total_antes} | Después: {len(df)}"
-        )
-
-    # =========================
-    # CONVERSIÓN DE FECHA
-    # =========================
-    df["fecha"] = pd.to_datetime(df["FechaEntrega"], errors="coerce")
-
-    # =========================
-    # FILTRO MES ANTERIOR
-    # =========================
-    total_antes = len(df)
-    df = df[
-        (df["fecha"].dt.year == target_year) &
-        (df["fecha"].dt.month == target_month)
-    ]
 
-    logger.info(
-        f"Filtro mes anterior {target_year}-{target_month:02d} | "
-        f"Antes: {total_antes} | Después: {len(df)}"
-    )
-
-    # =========================
-    # METADATA
-    # =========================
-    df["fuente"] = fuente
+def _canonical_names(columns):
+    names = list(columns)
+    for canonical, candidates in CANONICAL_COLUMNS.items():
+        found = _match_column(names, candidates)
+        if found and found != canonical:
+            names = [canonical if n == found else n for n in names]
+    return names
 
-    # =========================
-    # SAMPLE PARA VERIFICACIÓN
-    # =========================
-    if not df.empty:
-        logger.info("Sample de registros extraídos:")
-        logger.info(
-            "\n" + df.head(5).to_string(index=False)
-        )
-    else:
-        logger.warning("No hay registros luego de aplicar los filtros")
 
+def normalize_columns(df):
+    """Renombrar columnas del dataframe a nombres canónicos cuando sea posible.
+    Evita KeyError al referirse a nombres esperados en el código.
+    """
+    df.columns = canonical_names(df.columns)
     return df
 
+# =========================
+# MOTOR DE FECHAS
+# =========================
+# Día 0 de los seriales de fecha de Google Sheets
+GOOGLE_EPOCH = pd.Timestamp("1899-12-30")
+# Rango de seriales aceptados (1900-01-01 .. 9999-12-31)
+_MAX_SERIAL = 2958465
 
-def extract_sheet_pi(sheet_id, worksheet_name, year, month):
-    logger.info(f"Extrayendo datos | Sheet: {sheet_id}")
-
-    target_year = year
-    target_month = month
+_DIGIT_RE = re.compile(r"\d")
+# (forma de la cadena, dayfirst) -> formato strptime inferido
+_date_format_cache = {}
 
-    # =========================
-    # CONEXIÓN GOOGLE SHEETS
-    # =========================
-    ws = (
-        get_gspread_client()
-        .open_by_key(sheet_id)
-        .worksheet(worksheet_name)
-    )
 
-    records = get_all_records_robust(ws)
+def _swap_day_month(fmt):
+    return fmt.replace("%d", "\0").replace("%m", "%d").replace("\0", "%m")
 
-    df = pd.DataFrame(records)
-    logger.info(f"Registros totales extraídos: {len(df)}")
 
-    # =========================
-    # NORMALIZACIÓN BÁSICA
-    # =========================
-    df.columns = df.columns.str.strip()
-    df = normalize_columns(df)
+def _preferred_date_format(sample, dayfirst):
+    """Inferir el formato de `sample` respetando `dayfirst` en fechas
+    ambiguas. Las fechas que empiezan por el año se leen siempre año-mes-día.
+    """
+    fmt = guess_datetime_format(sample, dayfirst=dayfirst)
+    if fmt is None or "%d" not in fmt or "%m" not in fmt:
+        return fmt
+
+    day_first = fmt.index("%d") < fmt.index("%m")
+    if fmt.startswith("%Y"):
+        return _swap_day_month(fmt) if day_first else fmt
+    if day_first != dayfirst:
+        # la muestra no era ambigua (p. ej. 2/13/2024); se prefiere el orden
+        # pedido y las cadenas que no encajen pasan al parseo individual
+        return _swap_day_month(fmt)
+    return fmt
+
+
+def _parse_date_strings(strings, dayfirst):
+    """Parsear cadenas únicas agrupadas por forma (`99/99/9999`), con un
+    formato inferido y cacheado por forma. Las que no encajan en el formato
+    se parsean de a una como antes.
+    """
+    parsed = pd.Series(pd.NaT, index=range(len(strings)), dtype="datetime64[ns]")
+    shapes = pd.Series([_DIGIT_RE.sub("9", s) for s in strings])
 
+    for shape, idx in shapes.groupby(shapes).groups.items():
+        group = [strings[i] for i in idx]
 
-    def parse_google_date(value):
-        if pd.isna(value):
-            return pd.NaT
+        key = (shape, dayfirst)
+        if key not in _date_format_cache:
+            _date_format_cache[key] = _preferred_date_format(group[0], dayfirst)
+        fmt = _date_format_cache[key]
 
-        # 🔥 Caso 1: fecha serial de Google Sheets
-        if isinstance(value, (int, float)):
-            return pd.to_datetime("1899-12-30") + pd.to_timedelta(int(value), unit="D")
+        if fmt is not None:
+            result = pd.to_datetime(pd.Series(group), format=fmt, errors="coerce")
+        else:
+            result = pd.Series(pd.NaT, index=range(len(group)), dtype="datetime64[ns]")
 
-        # Caso 2: string normal
-        return pd.to_datetime(value, dayfirst=True, errors="coerce")
+        for i in np.flatnonzero(result.isna().to_numpy()):
+            result.iloc[i] = pd.to_datetime(group[i], dayfirst=dayfirst, errors="coerce")
 
+        parsed.iloc[list(idx)] = result.to_numpy(dtype="datetime64[ns]")
 
-    # localizar columna de fecha para esta hoja (puede llamarse FECHA_P u otra variante)
-    fecha_col_pi = _find_column(df, ["FECHA_P", "FECHA P", "fecha_p", "fecha_pago", "fecha"])
-    if fecha_col_pi is None:
-        logger.warning("No se encontró columna 'FECHA_P' en la hoja; se creará columna vacía 'FECHA_P'.")
-        df["FECHA_P"] = None
-        fecha_col_pi = "FECHA_P"
+    return parsed.to_numpy(dtype="datetime64[ns]")
 
-    df["fecha"] = df[fecha_col_pi].apply(parse_google_date)
 
-    invalid_dates = df["fecha"].isna().sum()
-    if invalid_dates > 0:
-        logger.warning(
-            f"Fechas inválidas detectadas en 'FECHA_P': {invalid_dates}"
-        )
+def parse_sheet_dates(values, dayfirst=True):
+    """Convertir una columna de fechas de Google Sheets a datetime64.
+    - Números: seriales de Google Sheets (días desde 1899-12-30).
+    - Cadenas: fechas en texto, `dayfirst` por defecto.
+    - Vacíos o no parseables: NaT.
 
+    Cada valor distinto se convierte una sola vez y el resultado se expande
+    sobre la columna.
+    """
+    series = values if isinstance(values, pd.Series) else pd.Series(values)
+    codes, uniques = pd.factorize(series.to_numpy(dtype=object))
 
-    # =========================
-    # FILTRO MES ANTERIOR
-    # =========================
-    total_antes = len(df)
-    df = df[
-        (df["fecha"].dt.year == target_year) &
-        (df["fecha"].dt.month == target_month)
-    ]
+    # la posición extra queda NaT para el código -1 (celdas vacías)
+    parsed = np.full(len(uniques) + 1, np.datetime64("NaT"), dtype="datetime64[ns]")
 
-    logger.info(
-        f"Filtro mes anterior {target_year}-{target_month:02d} | "
-        f"Antes: {total_antes} | Después: {len(df)}"
+    is_number = np.array(
+        [isinstance(u, (int, float, np.number)) and not isinstance(u, bool) for u in uniques],
+        dtype=bool
     )
+    if is_number.any():
+        serials = np.trunc(uniques[is_number].astype(float))
+        valid = np.isfinite(serials) & (serials >= 0) & (serials <= _MAX_SERIAL)
+        converted = np.full(len(serials), np.datetime64("NaT"), dtype="datetime64[ns]")
+        converted[valid] = (
+            GOOGLE_EPOCH + pd.to_timedelta(serials[valid], unit="D")
+        ).to_numpy(dtype="datetime64[ns]")
+        parsed[:-1][is_number] = converted
+
+    is_string = np.array([isinstance(u, str) for u in uniques], dtype=bool)
+    if is_string.any():
+        parsed[:-1][is_string] = _parse_date_strings(list(uniques[is_string]), dayfirst)
+
+    others = ~is_number & ~is_string
+    for i in np.flatnonzero(others):
+        parsed[i] = pd.to_datetime(uniques[i], errors="coerce")
+
+    return pd.Series(parsed[codes], index=series.index)
+
+
+# =========================
+# FILTROS ANTICIPADOS (PUSHDOWN)
+# =========================
+def month_bounds(year, month):
+    """Inicio (inclusive) y fin (exclusivo) del mes."""
+    start = pd.Timestamp(year=year, month=month, day=1)
+    return start, start + pd.offsets.MonthBegin(1)
+
+
+def pushdown_filter(headers, rows, date_column, start, end, dayfirst=True, status=None):
+    """Filtrar las filas crudas por periodo (y estado) antes de construir el
+    DataFrame, para tipar solo las filas que sobreviven.
+
+    Las columnas se resuelven igual que en el DataFrame, tras
+    `normalize_columns`: un nombre exacto, o una lista de candidatos para
+    `_find_column`. `status` es `(columna, valor)`. Si una columna no se
+    encuentra, ese filtro se omite y queda a cargo del filtro habitual sobre
+    el DataFrame.
+    """
+    if not rows:
+        return rows
 
-    # =========================
-    # SAMPLE PARA VERIFICACIÓN
-    # =========================
-    if not df.empty:
-        logger.info("Sample de registros extraídos:")
-        logger.info(
-            "\n" + df.head(5).to_string(index=False)
-        )
-    else:
-        logger.warning("No hay registros luego de aplicar los filtros")
-
-    return df
-
+    # nombres de columnas tal como quedarán en el DataFrame
+    names = canonical_names([str(h).strip() for h in headers])
 
+    def column_cells(column):
+        if isinstance(column, list):
+            found = _find_column(names, column)
+        else:
+            found = column if column in names else None
+        if found is None:
+            return None
+        j = names.index(found)
+        return [row[j] if j < len(row) else None for row in rows]
+
+    keep = np.ones(len(rows), dtype=bool)
+
+    if status is not None:
+        status_col, status_value = status
+        cells = column_cells(status_col)
+        if cells is not None:
+            values = pd.Series(_type_column(cells)[0])
+            keep &= (values.str.upper().str.strip() == status_value).fillna(False).to_numpy(dtype=bool)
+
+    cells = column_cells(date_column)
+    if cells is not None:
+        candidates = np.flatnonzero(keep)
+        fechas = parse_sheet_dates(
+            _type_column([cells[i] for i in candidates])[0], dayfirst=dayfirst
+        )
+        in_period = ((fechas >= start) & (fechas < end)).to_numpy(dtype=bool)
+        keep[:] = False
+        keep[candidates[in_period]] = True
 
-def extract_sheet_pi_2(sheet_id, worksheet_name, year, month):
-    logger.info(f"Extrayendo datos | Sheet: {sheet_id}")
+    return [rows[i] for i in np.flatnonzero(keep)]
 
-    target_year = year
-    target_month = month
 
-    # =========================
-    # CONEXIÓN GOOGLE SHEETS
-    # =========================
-    ws = (
-        get_gspread_client()
-        .open_by_key(sheet_id)
-        .worksheet(worksheet_name)
+def extract_source(source, sheet_id, worksheet_name, year, month, metadata=None):
+    """Extraer un mes de una fuente registrada."""
+    return extract_source_range(
+        source, sheet_id, worksheet_name,
+        *month_bounds(year, month),
+        metadata=metadata
     )
 
-    records = get_all_records_robust(ws)
 
-    df = pd.DataFrame(records)
-    logger.info(f"Registros totales extraídos: {len(df)}")
+def _frame_for_period(source, headers, rows, start, end):
+    """Construir el DataFrame tipado de la fuente y dejar solo las filas
+    del periodo `[start, end)`.
+    """
+    date_column = source["date_column"]
+
+    df = frame_from_rows(headers, rows)
 
     # =========================
     # NORMALIZACIÓN BÁSICA
@@ -337,141 +918,157 @@ def extract_sheet_pi_2(sheet_id, worksheet_name, year, month):
     df = normalize_columns(df)
     logger.info(f"Cabeceras detectadas: {list(df.columns)}")
 
-    # localizar columna de fecha para esta hoja (varias variantes posibles)
-    fecha_col_pi2 = _find_column(df, ["Fecha de pago", "fecha_pago", "FechaPago", "Fecha", "fecha"])
-    if fecha_col_pi2 is None:
-        logger.warning("No se encontró columna 'Fecha de pago' en la hoja; se creará columna vacía 'Fecha de pago'.")
-        df["Fecha de pago"] = None
-        fecha_col_pi2 = "Fecha de pago"
-
-
-    def parse_google_date(value):
-        if pd.isna(value):
-            return pd.NaT
-
-        # 🔥 Caso 1: fecha serial de Google Sheets
-        if isinstance(value, (int, float)):
-            return pd.to_datetime("1899-12-30") + pd.to_timedelta(int(value), unit="D")
-
-        # Caso 2: string normal
-        return pd.to_datetime(value, dayfirst=True, errors="coerce")
+    # localizar columna de fecha (nombre exacto o varias variantes posibles)
+    if isinstance(date_column, list):
+        fecha_col = _find_column(df, date_column)
+        date_name = date_column[0]
+    else:
+        fecha_col = date_column if date_column in df.columns else None
+        date_name = date_column
+    if fecha_col is None:
+        logger.warning(f"No se encontró columna '{date_name}' en la hoja; se creará columna vacía '{date_name}'.")
+        df[date_name] = None
+        fecha_col = date_name
 
+    # =========================
+    # FILTRO POR ESTADO
+    # =========================
+    if source["status"] is not None:
+        status_col, status_value = source["status"]
+        if status_col not in df.columns:
+            logger.warning(f"La columna '{status_col}' no existe en la hoja")
+        else:
+            total_antes = len(df)
+            df = df[df[status_col].str.upper().str.strip() == status_value]
+            logger.info(
+                f"Filtro {status_col}={status_value} | "
+                f"Antes: {total_antes} | Después: {len(df)}"
+            )
 
-    df["fecha"] = df["col_7"].apply(parse_google_date)
+    # =========================
+    # CONVERSIÓN DE FECHA
+    # =========================
+    df["fecha"] = parse_sheet_dates(df[fecha_col], dayfirst=source["dayfirst"])
 
     invalid_dates = df["fecha"].isna().sum()
     if invalid_dates > 0:
         logger.warning(
-            f"Fechas inválidas detectadas en 'FECHA_P': {invalid_dates}"
+            f"Fechas inválidas detectadas en '{fecha_col}': {invalid_dates}"
         )
 
-
     # =========================
-    # FILTRO MES ANTERIOR
+    # FILTRO DEL PERIODO
     # =========================
     total_antes = len(df)
-    df = df[
-        (df["fecha"].dt.year == target_year) &
-        (df["fecha"].dt.month == target_month)
-    ]
+    df = df[(df["fecha"] >= start) & (df["fecha"] < end)]
 
+    period = f"{start:%Y-%m}"
+    if end - pd.offsets.MonthBegin(1) > start:
+        period += f" a {end - pd.offsets.MonthBegin(1):%Y-%m}"
     logger.info(
-        f"Filtro mes anterior {target_year}-{target_month:02d} | "
+        f"Filtro periodo {period} | "
         f"Antes: {total_antes} | Después: {len(df)}"
     )
 
+    return df
+
+
+def extract_source_range(source, sheet_id, worksheet_name, start, end, metadata=None):
+    """Motor de extracción común a todas las fuentes registradas en
+    `sources.SOURCES`: lectura proyectada, filtros anticipados, tipado y
+    filtro del periodo `[start, end)` según la especificación de la fuente.
+    Un rango de varios meses se extrae con una sola lectura de la hoja.
+    """
+    headers, rows = fetch_source_table(source, sheet_id, worksheet_name)
+    df = _extract_rows(source, headers, rows, start, end, metadata)
+
     # =========================
     # SAMPLE PARA VERIFICACIÓN
     # =========================
     if not df.empty:
-        logger.info("Sample de registros extraídos:")
-        logger.info(
-            "\n" + df.head(5).to_string(index=False)
-        )
+        log_preview(logger, "Sample de registros extraídos:", df, 5)
     else:
         logger.warning("No hay registros luego de aplicar los filtros")
 
     return df
 
-def extract_sheet_pi_3(sheet_id, worksheet_name, year, month):
-    logger.info(f"Extrayendo datos | Sheet: {sheet_id}")
 
-    target_year = year
-    target_month = month
+def fetch_source_table(source, sheet_id, worksheet_name):
+    """Descargar `(headers, rows)` de la hoja de una fuente."""
+    logger.info(f"Extrayendo datos | Fuente: {source['name']} | Sheet: {sheet_id}")
 
     # =========================
     # CONEXIÓN GOOGLE SHEETS
     # =========================
-    ws = (
-        get_gspread_client()
-        .open_by_key(sheet_id)
-        .worksheet(worksheet_name)
-    )
+    with metrics.stage(source["name"], "fetch") as m:
+        headers, rows = get_worksheet_table(
+            sheet_id, worksheet_name, sheet_columns(source["name"])
+        )
+        m.rows_out = len(rows)
+    logger.info(f"Registros totales extraídos: {len(rows)}")
+    return headers, rows
 
-    records = get_all_records_robust(ws)
 
-    df = pd.DataFrame(records)
-    logger.info(f"Registros totales extraídos: {len(df)}")
+def iter_source_chunks(source, headers, rows, start, end, chunk_rows, metadata=None):
+    """Extraer las filas crudas de una fuente en bloques de `chunk_rows`
+    filas: cada bloque pasa por los filtros y el tipado por separado y se
+    entrega como DataFrame (los bloques sin filas del periodo se omiten).
+    Las filas ya procesadas se liberan de `rows`.
+    """
+    chunk_rows = max(1, chunk_rows)
+    for first in range(0, len(rows), chunk_rows):
+        chunk = rows[first:first + chunk_rows]
+        rows[first:first + len(chunk)] = [None] * len(chunk)
 
-    # =========================
-    # NORMALIZACIÓN BÁSICA
-    # =========================
-    df.columns = df.columns.str.strip()
-    df = normalize_columns(df)
-    logger.info(f"Cabeceras detectadas: {list(df.columns)}")
+        df = _extract_rows(source, headers, chunk, start, end, metadata)
+        del chunk
+        if not df.empty:
+            yield df
 
-    # localizar columna de fecha para esta hoja (varias variantes posibles)
-    fecha_col_pi2 = _find_column(df, ["Fecha de pago", "fecha_pago", "FechaPago", "Fecha", "fecha"])
-    if fecha_col_pi2 is None:
-        logger.warning("No se encontró columna 'Fecha de pago' en la hoja; se creará columna vacía 'Fecha de pago'.")
-        df["Fecha de pago"] = None
-        fecha_col_pi2 = "Fecha de pago"
 
+def _extract_rows(source, headers, rows, start, end, metadata=None):
+    """Filtros anticipados, tipado y filtro del periodo sobre filas crudas."""
+    # =========================
+    # FILTROS ANTICIPADOS
+    # =========================
+    # solo se tipan las filas del periodo
+    with metrics.stage(source["name"], "filter", rows_in=len(rows)) as m:
+        rows = pushdown_filter(
+            headers, rows, source["date_column"],
+            start, end,
+            dayfirst=source["dayfirst"],
+            status=source["status"]
+        )
+        m.rows_out = len(rows)
+    logger.info(f"Registros tras filtros anticipados: {len(rows)}")
 
-    def parse_google_date(value):
-        if pd.isna(value):
-            return pd.NaT
+    with metrics.stage(source["name"], "parse", rows_in=len(rows)) as m:
+        df = _frame_for_period(source, headers, rows, start, end)
+        m.rows_out = len(df)
 
-        # 🔥 Caso 1: fecha serial de Google Sheets
-        if isinstance(value, (int, float)):
-            return pd.to_datetime("1899-12-30") + pd.to_timedelta(int(value), unit="D")
+    # =========================
+    # METADATA
+    # =========================
+    for column, value in {**source["metadata"], **(metadata or {})}.items():
+        df[column] = value
 
-        # Caso 2: string normal
-        return pd.to_datetime(value, dayfirst=True, errors="coerce")
+    return df
 
 
-    df["fecha"] = df["col_23"].apply(parse_google_date)
+def extract_sheet_pc(sheet_id, worksheet_name, fuente, year, month):
+    return extract_source(
+        get_source("PC"), sheet_id, worksheet_name, year, month,
+        metadata={"fuente": fuente}
+    )
 
-    invalid_dates = df["fecha"].isna().sum()
-    if invalid_dates > 0:
-        logger.warning(
-            f"Fechas inválidas detectadas en 'FECHA_P': {invalid_dates}"
-        )
 
+def extract_sheet_pi(sheet_id, worksheet_name, year, month):
+    return extract_source(get_source("PI"), sheet_id, worksheet_name, year, month)
 
-    # =========================
-    # FILTRO MES ANTERIOR
-    # =========================
-    total_antes = len(df)
-    df = df[
-        (df["fecha"].dt.year == target_year) &
-        (df["fecha"].dt.month == target_month)
-    ]
 
-    logger.info(
-        f"Filtro mes anterior {target_year}-{target_month:02d} | "
-        f"Antes: {total_antes} | Después: {len(df)}"
-    )
+def extract_sheet_pi_2(sheet_id, worksheet_name, year, month):
+    return extract_source(get_source("PI2"), sheet_id, worksheet_name, year, month)
 
-    # =========================
-    # SAMPLE PARA VERIFICACIÓN
-    # =========================
-    if not df.empty:
-        logger.info("Sample de registros extraídos:")
-        logger.info(
-            "\n" + df.head(5).to_string(index=False)
-        )
-    else:
-        logger.warning("No hay registros luego de aplicar los filtros")
 
-    return df
+def extract_sheet_pi_3(sheet_id, worksheet_name, year, month):
+    return extract_source(get_source("PI3"), sheet_id, worksheet_name, year, month)
@@ -0,0 +1,28 @@
+import gzip
+import os
+import threading
+from contextlib import contextmanager
+
+
+@contextmanager
+def atomic_open(path, compress=False):
+    """Abrir `path` para escribir texto UTF-8 (gzip si `compress`) de forma
+    atómica: se escribe en un temporal por hilo y se reemplaza al cerrar,
+    así un lector nunca ve un archivo a medias. Si la escritura falla el
+    temporal se elimina y el archivo anterior queda intacto.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    opener = gzip.open if compress else open
+    try:
+        with opener(tmp_path, "wt", encoding="utf-8") as f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
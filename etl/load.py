@@ -1,7 +1,15 @@
 from supabase import create_client
 from dotenv import load_dotenv
+import json
 import os
+import threading
+import time
+from datetime import date
+import numpy as np
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import metrics
+import scheduler
 from logger import get_logger
 from postgrest.exceptions import APIError
 
@@ -9,50 +17,611 @@ logger = get_logger("LOAD")
 
 load_dotenv()
 
-supabase = create_client(
-    os.getenv("SUPABASE_URL"),
-    os.getenv("SUPABASE_KEY")
-)
+# =========================
+# CLIENTE SUPABASE
+# =========================
+_client_lock = threading.Lock()
+_supabase_client = None
 
-def load(df: pd.DataFrame):
-    logger.info(f"Cargando registros en Supabase: {len(df)}")
-    # Mostrar columnas para ayudar a identificar claves foráneas
-    logger.info(f"Columnas recibidas para carga: {df.columns.tolist()}")
 
-    data = df.to_dict(orient="records")
+def get_supabase_client():
+    """Retornar el cliente de Supabase, creándolo en el primer uso (importar
+    el módulo no requiere credenciales).
+    """
+    global _supabase_client
+    with _client_lock:
+        if _supabase_client is None:
+            _supabase_client = create_supabase_client()
+        return _supabase_client
 
+
+def create_supabase_client():
+    """Cliente real de Supabase con las credenciales del entorno."""
+    return create_client(
+        os.getenv("SUPABASE_URL"),
+        os.getenv("SUPABASE_KEY")
+    )
+
+
+def set_supabase_client(client):
+    """Reemplazar el cliente de Supabase (p. ej. un doble en memoria para
+    benchmarks). Con None se vuelve a crear el cliente real en el próximo uso.
+    """
+    global _supabase_client
+    with _client_lock:
+        _supabase_client = client
+
+# =========================
+# CONFIGURACIÓN DE CARGA POR LOTES
+# =========================
+LOAD_BATCH_SIZE = int(os.getenv("LOAD_BATCH_SIZE", "500"))
+LOAD_MIN_BATCH_SIZE = int(os.getenv("LOAD_MIN_BATCH_SIZE", "50"))
+LOAD_MAX_BATCH_SIZE = int(os.getenv("LOAD_MAX_BATCH_SIZE", "5000"))
+LOAD_MAX_WORKERS = int(os.getenv("LOAD_MAX_WORKERS", "4"))
+# Latencia objetivo por lote; el tamaño crece por debajo y se reduce por encima
+LOAD_TARGET_SECONDS = float(os.getenv("LOAD_TARGET_SECONDS", "2.0"))
+
+# "insert" (por defecto) o "upsert": en upsert las filas ya cargadas se
+# omiten según la clave de conflicto de la tabla destino
+LOAD_MODE = os.getenv("LOAD_MODE", "insert")
+
+# Clave de conflicto por tabla destino (requiere un índice único en Supabase)
+TABLE_CONFLICTS = {
+    "transactions": {
+        "on_conflict": "business_id,id_referenced,date",
+        # DO NOTHING: una fila existente no se reescribe
+        "ignore_duplicates": True,
+        # consulta previa de filas existentes: igualdad en la primera
+        # columna e `in` por bloques en la segunda
+        "lookup": ("business_id", "id_referenced"),
+    },
+}
+
+# Antes de insertar se descartan las filas repetidas en la carga y las que
+# ya existen en la tabla (según su clave de conflicto)
+LOAD_PRECHECK = os.getenv("LOAD_PRECHECK", "1") == "1"
+# Valores por filtro `in` de la consulta previa (acota el largo de la URL)
+PRECHECK_CHUNK_SIZE = int(os.getenv("PRECHECK_CHUNK_SIZE", "300"))
+# Filas máximas por respuesta de PostgREST (db-max-rows de Supabase)
+PRECHECK_MAX_ROWS = int(os.getenv("PRECHECK_MAX_ROWS", "1000"))
+
+
+class AdaptiveBatchSize:
+    """Tamaño de lote que se ajusta según la latencia y los errores
+    observados: crece mientras los lotes responden bajo la latencia
+    objetivo y se reduce a la mitad ante lotes lentos o fallidos.
+    """
+
+    def __init__(self, initial, minimum, maximum, target_seconds):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target_seconds = target_seconds
+        self.size = max(minimum, min(initial, maximum))
+        self._lock = threading.Lock()
+
+    def record(self, seconds, ok):
+        with self._lock:
+            if not ok or seconds > self.target_seconds:
+                self.size = max(self.minimum, self.size // 2)
+            elif seconds < self.target_seconds / 2:
+                self.size = min(self.maximum, int(self.size * 1.5))
+            return self.size
+
+
+# =========================
+# SERIALIZACIÓN
+# =========================
+def _serialize_column(col):
+    """Convertir una columna a una lista de valores nativos JSON-safe:
+    NaN/NaT/NA -> None, escalares numpy -> int/float/bool de Python y
+    fechas -> cadenas ISO (`YYYY-MM-DD` si no tienen hora).
+    """
+    if isinstance(col.dtype, pd.CategoricalDtype):
+        # se serializan solo las categorías y se expanden por sus códigos
+        categories = _serialize_column(pd.Series(col.cat.categories))
+        lookup = np.empty(len(categories) + 1, dtype=object)
+        lookup[:len(categories)] = categories
+        lookup[-1] = None
+        return lookup[col.cat.codes.to_numpy()].tolist()
+
+    if pd.api.types.is_datetime64_any_dtype(col):
+        has_time = (col.dropna() != col.dropna().dt.normalize()).any()
+        text = col.dt.strftime("%Y-%m-%dT%H:%M:%S" if has_time else "%Y-%m-%d")
+        return text.astype(object).where(col.notna(), None).tolist()
+
+    if pd.api.types.is_bool_dtype(col) or pd.api.types.is_integer_dtype(col):
+        if not col.hasnans:
+            # numpy .tolist() ya retorna tipos nativos
+            return col.to_numpy().tolist()
+        return col.astype(object).where(col.notna(), None).tolist()
+
+    if pd.api.types.is_float_dtype(col):
+        values = col.to_numpy(dtype=float, na_value=np.nan)
+        result = values.tolist()
+        if np.isnan(values).any():
+            for i in np.flatnonzero(np.isnan(values)):
+                result[i] = None
+        return result
+
+    values = col.to_numpy(dtype=object)
+    missing = pd.isna(values)
+    if missing.any():
+        values = values.copy()
+        values[missing] = None
+
+    kind = pd.api.types.infer_dtype(values, skipna=True)
+    if kind in ("string", "empty"):
+        return values.tolist()
+    # columnas mixtas: solo aquí se revisa celda a celda
+    return [
+        v.item() if isinstance(v, np.generic)
+        else v.isoformat() if isinstance(v, (pd.Timestamp, date))
+        else v
+        for v in values
+    ]
+
+
+def serialize_columns(df):
+    """Serializar el DataFrame columna a columna. Retorna `(columnas,
+    listas de valores)`; los registros se arman por lote con `records_slice`
+    para no duplicar en memoria toda la carga como lista de dicts.
+    """
+    names = [str(c) for c in df.columns]
+    return names, [_serialize_column(df[c]) for c in df.columns]
+
+
+def serialize(df, table="transactions"):
+    """`serialize_columns` medido como etapa de carga de `table`."""
+    with metrics.stage(table, "serialize", rows_in=len(df)) as m:
+        payload = serialize_columns(df)
+        m.rows_out = len(df)
+    return payload
+
+
+def payload_rows(payload):
+    _, columns = payload
+    return len(columns[0]) if columns else 0
+
+
+def partition_payload(payload, keys):
+    """Separar un payload serializado por `keys` (una clave por fila, p. ej.
+    el año-mes). Retorna `{clave: payload}` en orden de clave; dentro de
+    cada parte las filas conservan su orden.
+    """
+    names, columns = payload
+    codes, uniques = pd.factorize(pd.Series(keys), sort=True)
+    order = np.argsort(codes, kind="stable")
+    bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+    arrays = [np.asarray(values, dtype=object)[order] for values in columns]
+    return {
+        key: (names, [a[bounds[k]:bounds[k + 1]].tolist() for a in arrays])
+        for k, key in enumerate(uniques)
+    }
+
+
+def concat_payloads(payloads):
+    """Unir payloads serializados con las mismas columnas."""
+    names = payloads[0][0]
+    columns = [[] for _ in names]
+    for _, part in payloads:
+        for values, extra in zip(columns, part):
+            values.extend(extra)
+    return names, columns
+
+
+def records_slice(payload, start, end):
+    """Armar los registros JSON-safe de las filas `[start, end)`."""
+    names, columns = payload
+    return [
+        dict(zip(names, row))
+        for row in zip(*(values[start:end] for values in columns))
+    ]
+
+
+def _write(table, records, mode):
+    """Enviar registros a la tabla con insert o upsert según `mode`.
+    Retorna la cantidad de filas escritas (en upsert las ya existentes no
+    se cuentan).
+    """
+    query = get_supabase_client().table(table)
+    if mode == "upsert":
+        conflict = TABLE_CONFLICTS[table]
+        query = query.upsert(
+            records,
+            on_conflict=conflict["on_conflict"],
+            ignore_duplicates=conflict["ignore_duplicates"]
+        )
+    else:
+        query = query.insert(records)
+
+    # bytes del cuerpo JSON enviado; los requests fallidos también cuentan
+    nbytes = len(
+        json.dumps(records, ensure_ascii=False, separators=(",", ":"))
+    ) if metrics.METRICS_COUNT_BYTES else 0
     try:
-        supabase.table("transactions").insert(
-            data
-        ).execute()
-        logger.info("Carga mensual completada.")
+        # un insert repetido tras un timeout puede duplicar filas; el upsert
+        # con clave de conflicto se puede repetir sin efecto
+        response = scheduler.call(
+            "supabase", query.execute, idempotent=(mode == "upsert")
+        )
+    finally:
+        metrics.count("supabase", nbytes=nbytes)
+    if getattr(response, "data", None) is not None:
+        return len(response.data)
+    return len(records) if isinstance(records, list) else 1
+
+
+def _isolate_rejections(records, offset, table, mode, positions=None):
+    """Aislar los registros conflictivos de un lote fallido por bisección:
+    cada mitad se reintenta por separado, las que pasan quedan cargadas y
+    las que fallan se vuelven a dividir hasta llegar al registro individual.
+    Con k registros malos cuesta O(k·log n) requests. Un error transitorio
+    (red, 5xx, 429 tras agotar los reintentos) no se bisecta: se propaga.
+    Retorna las filas escritas y la lista de rechazos
+    `{"index", "record", "error"}`. `positions` da el índice original de
+    cada registro cuando el lote no es contiguo (filas omitidas antes).
+    """
+    written = 0
+    rejected = []
+
+    def index_of(i):
+        return positions[i] if positions is not None else offset + i
+
+    def attempt(start, end):
+        nonlocal written
+        try:
+            written += _write(table, records[start:end], mode)
+        except Exception as e:
+            if scheduler.is_retryable(e):
+                raise
+            if end - start == 1:
+                # Registrar el registro conflictivo con su índice y detalle del error
+                logger.error(f"Registro conflictivo índice {index_of(start)}: {records[start]}")
+                logger.error(f"Error al insertar registro índice {index_of(start)}: {e}")
+                rejected.append({
+                    "index": index_of(start),
+                    "record": records[start],
+                    "error": str(e),
+                })
+                return
+            split(start, end)
+
+    def split(start, end):
+        middle = (start + end) // 2
+        attempt(start, middle)
+        attempt(middle, end)
+
+    # el lote completo ya falló: se empieza por sus mitades
+    if len(records) == 1:
+        attempt(0, 1)
+    else:
+        split(0, len(records))
+
+    return written, rejected
+
+
+def _load_batch(batch, offset, sizer, table, mode, positions=None):
+    """Escribir un lote. Si falla por los datos (restricción, tipo inválido),
+    se aíslan sus registros conflictivos sin afectar a los demás lotes. Un
+    error transitorio que agotó los reintentos aborta la carga: bisectar
+    durante una caída solo multiplica los requests y reporta rechazos falsos.
+    """
+    started = time.monotonic()
+    try:
+        written = _write(table, batch, mode)
+        elapsed = time.monotonic() - started
+        sizer.record(elapsed, ok=True)
+        return {"offset": offset, "size": len(batch), "ok": True,
+                "written": written, "seconds": elapsed, "rejected": []}
     except Exception as e:
-        # Loguear excepción de nivel superior
-        logger.exception("Error en carga masiva a Supabase. Intentando inserción registro a registro para aislar conflicto.")
-
-        # Intentar insertar registro por registro para identificar el conflictivo
-        for idx, rec in enumerate(data):
-            # Normalizar valores tipo numpy/pandas a nativos y convertir NaN a None
-            rec_clean = {}
-            for k, v in rec.items():
-                try:
-                    if pd.isna(v):
-                        rec_clean[k] = None
-                    elif hasattr(v, "item"):
-                        rec_clean[k] = v.item()
-                    else:
-                        rec_clean[k] = v
-                except Exception:
-                    rec_clean[k] = v
+        elapsed = time.monotonic() - started
+        sizer.record(elapsed, ok=False)
+        if scheduler.is_retryable(e):
+            logger.error(
+                f"Lote desde índice {offset} ({len(batch)} registros) falló por "
+                f"un error transitorio ({type(e).__name__}: {e}); se aborta la carga"
+            )
+            raise
+        logger.exception(
+            f"Error en lote desde índice {offset} ({len(batch)} registros). "
+            "Aislando registros conflictivos por bisección."
+        )
+
+    written, rejected = _isolate_rejections(batch, offset, table, mode, positions)
+    return {"offset": offset, "size": len(batch), "ok": not rejected,
+            "written": written, "seconds": time.monotonic() - started,
+            "rejected": rejected}
+
+
+# =========================
+# CONSULTA PREVIA DE EXISTENTES
+# =========================
+def _key_value(column, value):
+    # la fecha puede volver como timestamp (`2024-03-01T00:00:00+00:00`)
+    if column == "date" and value is not None:
+        return str(value)[:10]
+    return value
+
+
+def _payload_keys(payload, columns):
+    """Clave de cada fila del payload, o None si falta alguna columna."""
+    names, values = payload
+    if not all(c in names for c in columns):
+        return None
+    key_values = [values[names.index(c)] for c in columns]
+    return [
+        tuple(_key_value(c, v) for c, v in zip(columns, row))
+        for row in zip(*key_values)
+    ]
+
+
+def _lookup_existing(table, columns, lookup, group, ids):
+    """Claves de las filas de `table` con `lookup[0] = group` y
+    `lookup[1] in ids`.
+    """
+    query = (
+        get_supabase_client().table(table)
+        .select(",".join(columns))
+        .eq(lookup[0], group)
+        .in_(lookup[1], ids)
+    )
+    try:
+        response = scheduler.call("supabase", query.execute)
+    finally:
+        metrics.count("supabase")
+    rows = getattr(response, "data", None) or []
+    if len(rows) >= PRECHECK_MAX_ROWS:
+        # respuesta posiblemente truncada: las filas no vistas se insertan y,
+        # si existen, se aíslan como rechazos
+        logger.warning(
+            f"Consulta previa con {len(rows)} filas (límite {PRECHECK_MAX_ROWS}); "
+            "reducir PRECHECK_CHUNK_SIZE"
+        )
+    return {tuple(_key_value(c, row.get(c)) for c in columns) for row in rows}
+
+
+def find_existing(table, keys, executor=None):
+    """Subconjunto de `keys` (claves de conflicto de `table`) que ya existe
+    en la tabla. Se consulta con filtros `in` de hasta PRECHECK_CHUNK_SIZE
+    valores por grupo, en paralelo si se pasa `executor`.
+    """
+    conflict = TABLE_CONFLICTS[table]
+    columns = conflict["on_conflict"].split(",")
+    lookup = conflict["lookup"]
+    group_at, id_at = columns.index(lookup[0]), columns.index(lookup[1])
+
+    ids_by_group = {}
+    for key in keys:
+        if None in key:
+            continue
+        ids_by_group.setdefault(key[group_at], set()).add(key[id_at])
+
+    queries = [
+        (group, ids[i:i + PRECHECK_CHUNK_SIZE])
+        for group, values in ids_by_group.items()
+        for ids in [sorted(values, key=str)]
+        for i in range(0, len(ids), PRECHECK_CHUNK_SIZE)
+    ]
+    # una copia del contexto por consulta: los requests van a la etapa actual
+    calls = [
+        (metrics.in_context(_lookup_existing), group, ids) for group, ids in queries
+    ]
+    if executor is None:
+        found = [fn(table, columns, lookup, group, ids) for fn, group, ids in calls]
+    else:
+        found = executor.map(
+            lambda call: call[0](table, columns, lookup, call[1], call[2]), calls
+        )
+
+    existing = set().union(*found) if queries else set()
+    return existing.intersection(keys)
+
+
+def _check_mode(table, mode):
+    if mode not in ("insert", "upsert"):
+        raise ValueError(f"Modo de carga no soportado: {mode}")
+    if mode == "upsert" and table not in TABLE_CONFLICTS:
+        raise ValueError(f"No hay clave de conflicto configurada para '{table}'")
+
+
+class StreamLoader:
+    """Carga incremental: cada DataFrame recibido con `send` se serializa y
+    se divide en lotes que se envían en segundo plano mientras el llamador
+    prepara el siguiente. Como mucho hay `max_workers` lotes en vuelo; si
+    están todos ocupados `send` espera, así la memoria queda acotada por el
+    tamaño del bloque y no por el total de la carga.
+
+    Con `precheck` (LOAD_PRECHECK) cada payload se depura antes de
+    despacharse: se omiten las filas cuya clave de conflicto ya se recibió
+    en esta carga (p. ej. un pago presente en PI y PI2) y las que ya existen
+    en la tabla. Los índices de rechazos siguen siendo los de las filas
+    recibidas.
+
+    `close` espera los lotes pendientes y retorna el reporte de `load`.
+    """
+
+    def __init__(self, table="transactions", mode=None, batch_size=None,
+                 max_workers=None, precheck=None):
+        self.table = table
+        self.mode = mode or LOAD_MODE
+        _check_mode(table, self.mode)
+        if precheck is None:
+            precheck = LOAD_PRECHECK
+        self.precheck = precheck and table in TABLE_CONFLICTS
+        self.skipped = {"duplicated": 0, "existing": 0}
+        # claves ya despachadas o encontradas en la tabla
+        self._seen = set()
+
+        self.sizer = AdaptiveBatchSize(
+            batch_size or LOAD_BATCH_SIZE,
+            LOAD_MIN_BATCH_SIZE,
+            LOAD_MAX_BATCH_SIZE,
+            LOAD_TARGET_SECONDS
+        )
+        self.max_workers = max(1, max_workers or LOAD_MAX_WORKERS)
+        self.total = 0
+        self._report = []
+        self._inflight = set()
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="etl-load"
+        )
+        # la etapa de carga abarca todos los envíos; los requests de cada
+        # lote se atribuyen a ella
+        self._stage = metrics.stage(table, "load")
+        self._stage.start()
+        self._closed = False
+
+    def send(self, df):
+        """Serializar `df` y despachar sus lotes."""
+        if len(df):
+            self.send_payload(serialize(df, self.table))
+
+    def send_payload(self, payload):
+        """Despachar los lotes de un payload ya serializado (ver `serialize`)."""
+        n = payload_rows(payload)
+        if not n:
+            return
+        if not self.total:
+            # Mostrar columnas para ayudar a identificar claves foráneas
+            logger.info(f"Columnas recibidas para carga: {payload[0]}")
+
+        kept = None
+        if self.precheck:
+            payload, kept = self._precheck(payload)
+
+        # el tamaño de cada lote se decide al despacharlo, con lo observado hasta ahí
+        position = 0
+        remaining = payload_rows(payload)
+        while position < remaining:
+            self._collect(self.max_workers - 1)
+            batch = records_slice(payload, position, position + self.sizer.size)
+            positions = None
+            if kept is not None:
+                positions = [self.total + i for i in kept[position:position + len(batch)]]
+            self._inflight.add(self._executor.submit(
+                metrics.in_context(_load_batch, self._stage),
+                batch, positions[0] if positions else self.total + position,
+                self.sizer, self.table, self.mode, positions
+            ))
+            position += len(batch)
+        self.total += n
+
+    def _precheck(self, payload):
+        """Omitir filas repetidas o ya existentes. Retorna el payload
+        depurado y los índices conservados (None si no se omitió nada).
+        """
+        columns = TABLE_CONFLICTS[self.table]["on_conflict"].split(",")
+        keys = _payload_keys(payload, columns)
+        if keys is None:
+            return payload, None
+
+        n = len(keys)
+        with metrics.stage(self.table, "precheck", rows_in=n) as m:
+            # filas con algún componente nulo en la clave no se pueden
+            # comparar (NULL no colisiona en la restricción): se envían tal cual
+            unkeyed = [i for i, key in enumerate(keys) if None in key]
+            fresh = {}
+            for i, key in enumerate(keys):
+                if None not in key and key not in self._seen and key not in fresh:
+                    fresh[key] = i
+            duplicated = n - len(unkeyed) - len(fresh)
 
             try:
-                supabase.table("transactions").insert(rec_clean).execute()
-            except Exception as e2:
-                # Registrar el registro conflictivo con su índice y detalle del error
-                logger.error(f"Registro conflictivo índice {idx}: {rec_clean}")
-                logger.error(f"Error al insertar registro índice {idx}: {e2}")
-                # Re-lanzar para que el proceso principal no continúe silenciosamente
-                raise
+                existing = find_existing(self.table, fresh, self._executor)
+            except Exception:
+                # sin consulta previa las filas existentes se detectan al insertar
+                logger.exception("Falló la consulta previa de filas existentes; se omite")
+                existing = set()
+
+            self._seen.update(fresh)
+            kept = sorted(
+                unkeyed + [i for key, i in fresh.items() if key not in existing]
+            )
+            m.rows_out = len(kept)
+
+        self.skipped["duplicated"] += duplicated
+        self.skipped["existing"] += len(existing)
+        if duplicated or existing:
+            logger.info(
+                f"Consulta previa | Registros: {n} | Repetidos en la carga: {duplicated} | "
+                f"Ya existentes: {len(existing)} | A enviar: {len(kept)}"
+            )
+        if len(kept) == n:
+            return payload, None
+
+        names, values = payload
+        return (names, [[col[i] for i in kept] for col in values]), kept
 
-        # Si todos los registros individuales pasan (improbable), relanzar la excepción original
-        raise
+    def _collect(self, limit):
+        """Esperar lotes en vuelo hasta que queden como mucho `limit`."""
+        while len(self._inflight) > limit:
+            done, self._inflight = wait(self._inflight, return_when=FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                self._report.append(result)
+                logger.info(
+                    f"Lote desde índice {result['offset']} | "
+                    f"Registros: {result['size']} | "
+                    f"{'OK' if result['ok'] else 'CON ERRORES'} | "
+                    f"{result['seconds']:.2f}s"
+                )
+
+    def close(self):
+        """Esperar los lotes pendientes y retornar `{total, written,
+        batches, rejected, skipped}`.
+        """
+        if self._closed:
+            raise RuntimeError("StreamLoader ya cerrado")
+        self._closed = True
+        try:
+            self._collect(0)
+        finally:
+            self._executor.shutdown(wait=True)
+            self._stage.rows_in = self.total
+            self._stage.rows_out = sum(r["written"] for r in self._report)
+            self._stage.stop()
+
+        total = self.total
+        batches = sorted(self._report, key=lambda r: r["offset"])
+        failed = [r for r in batches if not r["ok"]]
+        rejected = [rej for r in failed for rej in r["rejected"]]
+        written = sum(r["written"] for r in batches)
+
+        logger.info(
+            f"Lotes enviados: {len(batches)} | Con errores: {len(failed)} | "
+            f"Registros escritos: {written} | Ya existentes: "
+            f"{total - written - len(rejected) - self.skipped['duplicated']} | "
+            f"Repetidos en la carga: {self.skipped['duplicated']} | "
+            f"Rechazados: {len(rejected)}"
+        )
+
+        if rejected:
+            # los lotes y mitades correctos ya quedaron cargados
+            logger.warning(
+                f"{len(rejected)} registro(s) rechazado(s); ver reporte de carga"
+            )
+        else:
+            logger.info("Carga mensual completada.")
+
+        return {
+            "total": total,
+            "written": written,
+            "batches": batches,
+            "rejected": rejected,
+            "skipped": dict(self.skipped),
+        }
+
+
+def load(df: pd.DataFrame, batch_size=None, max_workers=None,
+         table="transactions", mode=None):
+    mode = mode or LOAD_MODE
+    _check_mode(table, mode)
+
+    logger.info(f"Cargando registros en Supabase: {len(df)} | Tabla: {table} | Modo: {mode}")
+
+    loader = StreamLoader(table, mode, batch_size, max_workers)
+    try:
+        loader.send(df)
+    finally:
+        report = loader.close()
+    return report
@@ -1,18 +1,100 @@
+import atexit
+import json
 import logging
+import os
+import queue
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+# =========================
+# CONFIGURACIÓN
+# =========================
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# "text" (por defecto) o "json" (una línea JSON por registro)
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
+# Nivel de los samples de DataFrames; por debajo de LOG_LEVEL no se renderizan
+LOG_PREVIEW_LEVEL = logging.getLevelName(os.getenv("LOG_PREVIEW_LEVEL", "INFO").upper())
+
+_lock = threading.Lock()
+_listener = {"listener": None, "handler": None}
+
+
+class JsonFormatter(logging.Formatter):
+    """Un objeto JSON por registro (timestamp, nivel, logger, hilo, mensaje)."""
+
+    def format(self, record):
+        data = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            data["exception"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """QueueHandler que no formatea en el hilo que loguea: el mensaje (y
+    los samples de DataFrames) se arma en el hilo del listener.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+def _formatter():
+    if LOG_FORMAT == "json":
+        return JsonFormatter()
+    return logging.Formatter("%(asctime)s | %(levelname)s | %(name)s | %(message)s")
+
+
+def _queue_handler():
+    """Handler compartido: encola los registros y un único hilo los escribe
+    en stderr, así las etapas concurrentes no se bloquean entre sí.
+    """
+    with _lock:
+        if _listener["handler"] is None:
+            log_queue = queue.SimpleQueue()
+            stream = logging.StreamHandler()
+            stream.setFormatter(_formatter())
+            listener = QueueListener(log_queue, stream, respect_handler_level=True)
+            listener.start()
+            # vaciar la cola antes de terminar el proceso
+            atexit.register(listener.stop)
+            _listener["listener"] = listener
+            _listener["handler"] = _DeferredQueueHandler(log_queue)
+        return _listener["handler"]
+
 
 def get_logger(name: str):
     logger = logging.getLogger(name)
 
     if not logger.handlers:
-        logger.setLevel(logging.INFO)
-
-        handler = logging.StreamHandler()
-        formatter = logging.Formatter(
-            "%(asctime)s | %(levelname)s | %(name)s | %(message)s"
-        )
-        handler.setFormatter(formatter)
-
-        logger.addHandler(handler)
+        logger.setLevel(LOG_LEVEL)
+        logger.addHandler(_queue_handler())
         logger.propagate = False
 
     return logger
+
+
+class DataFramePreview:
+    """Sample de un DataFrame que se convierte a texto recién al escribirse
+    el registro. Se guarda solo `head(rows)`, no el DataFrame completo.
+    """
+
+    def __init__(self, df, rows=5):
+        self.sample = df.head(rows)
+
+    def __str__(self):
+        return "\n" + self.sample.to_string(index=False)
+
+
+def log_preview(logger, title, df, rows=5):
+    """Loguear un sample de `df` con nivel LOG_PREVIEW_LEVEL, sin formatear
+    la tabla si ese nivel no está habilitado.
+    """
+    if logger.isEnabledFor(LOG_PREVIEW_LEVEL):
+        logger.log(LOG_PREVIEW_LEVEL, "%s%s", title, DataFramePreview(df, rows))
@@ -0,0 +1,315 @@
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+from fileio import atomic_open
+from logger import get_logger
+
+try:
+    import resource
+except ImportError:  # Windows: sin getrusage
+    resource = None
+
+logger = get_logger("METRICS")
+
+# =========================
+# CONFIGURACIÓN
+# =========================
+METRICS_DIR = os.path.join(os.getenv("ETL_CACHE_DIR", ".etl_cache"), "metrics")
+# Reporte JSON de la última corrida ("" = no se escribe)
+METRICS_REPORT_PATH = os.getenv(
+    "METRICS_REPORT_PATH", os.path.join(METRICS_DIR, "run_report.json")
+)
+# Archivo para el textfile collector de node_exporter ("" = no se escribe)
+METRICS_TEXTFILE_PATH = os.getenv(
+    "METRICS_TEXTFILE_PATH", os.path.join(METRICS_DIR, "etl.prom")
+)
+
+# Medir los bytes de payload de Sheets y Supabase (1 = activado). Es
+# aproximado y recorre cada celda recibida o serializa cada lote enviado
+METRICS_COUNT_BYTES = os.getenv("METRICS_COUNT_BYTES", "0") == "1"
+
+STAGES = ("fetch", "filter", "parse", "transform", "concat", "serialize", "precheck", "load")
+
+_lock = threading.Lock()
+_run = {"name": None, "mode": None, "started_at": None, "started": 0.0,
+        "stages": [], "services": {}, "retries": {}}
+# etapa activa en el hilo/contexto actual; los requests se atribuyen a ella
+_current_stage = contextvars.ContextVar("etl_stage", default=None)
+
+
+def peak_rss_bytes():
+    """Pico de memoria residente del proceso (ru_maxrss: KB en Linux, bytes
+    en macOS). 0 si la plataforma no lo expone.
+    """
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def current_rss_bytes():
+    """Memoria residente actual del proceso (/proc/self/statm en Linux).
+    0 si la plataforma no lo expone.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return 0
+    return pages * os.sysconf("SC_PAGE_SIZE")
+
+
+class StageMetrics:
+    """Medición de una etapa de una fuente. Se usa como context manager:
+    mide el tiempo de pared y la variación de RSS entre la entrada y la
+    salida (incluye lo que asignen otros hilos en paralelo); las filas se
+    asignan dentro del bloque (`rows_in`, `rows_out`).
+    """
+
+    def __init__(self, source, stage, rows_in=None):
+        self.source = source
+        self.stage = stage
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.seconds = 0.0
+        self.requests = {}
+        self.bytes = {}
+        self.rss_delta = 0
+        self._started = None
+        self._rss_start = 0
+        self._token = None
+
+    def __enter__(self):
+        self.start()
+        self._token = _current_stage.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _current_stage.reset(self._token)
+        self.stop()
+        return False
+
+    def start(self):
+        """Iniciar la medición sin activar la etapa en el contexto actual
+        (etapas que abarcan varias llamadas, ver `in_context`).
+        """
+        self._started = time.perf_counter()
+        self._rss_start = current_rss_bytes()
+
+    def stop(self):
+        self.seconds = time.perf_counter() - self._started
+        self.rss_delta = current_rss_bytes() - self._rss_start
+        with _lock:
+            _run["stages"].append(self)
+
+    def count(self, service, requests=1, nbytes=0):
+        with _lock:
+            self.requests[service] = self.requests.get(service, 0) + requests
+            self.bytes[service] = self.bytes.get(service, 0) + nbytes
+
+
+def stage(source, name, rows_in=None):
+    """Abrir la medición de la etapa `name` de `source`."""
+    return StageMetrics(source, name, rows_in)
+
+
+def count(service, requests=1, nbytes=0):
+    """Registrar requests y bytes de un servicio externo ("sheets",
+    "supabase"). Se suman al total de la corrida y a la etapa activa.
+    Los bytes solo se miden con METRICS_COUNT_BYTES.
+    """
+    with _lock:
+        totals = _run["services"].setdefault(service, {"requests": 0, "bytes": 0})
+        totals["requests"] += requests
+        totals["bytes"] += nbytes
+    current = _current_stage.get()
+    if current is not None:
+        current.count(service, requests, nbytes)
+
+
+def count_retry(service):
+    """Registrar un reintento de una llamada a `service`."""
+    with _lock:
+        _run["retries"][service] = _run["retries"].get(service, 0) + 1
+
+
+def in_context(fn, stage=None):
+    """Envolver `fn` para que corra en una copia del contexto actual; así
+    los hilos de un pool atribuyen sus requests a la etapa que los lanzó
+    (o a `stage`, si se indica).
+    """
+    ctx = contextvars.copy_context()
+    if stage is not None:
+        ctx.run(_current_stage.set, stage)
+    return lambda *args, **kwargs: ctx.run(fn, *args, **kwargs)
+
+
+def start_run(name, mode):
+    """Iniciar una corrida: descarta las mediciones anteriores. `mode`
+    ("mensual", "backfill") es la única etiqueta de corrida en Prometheus,
+    para no crear series nuevas en cada periodo.
+    """
+    with _lock:
+        _run["name"] = name
+        _run["mode"] = mode
+        _run["started_at"] = datetime.now(timezone.utc)
+        _run["started"] = time.perf_counter()
+        _run["stages"] = []
+        _run["services"] = {}
+        _run["retries"] = {}
+
+
+def _aggregate():
+    """Sumar las mediciones por (fuente, etapa)."""
+    grouped = {}
+    for m in _run["stages"]:
+        entry = grouped.setdefault((m.source, m.stage), {
+            "source": m.source,
+            "stage": m.stage,
+            "calls": 0,
+            "seconds": 0.0,
+            "rows_in": None,
+            "rows_out": None,
+            "requests": {},
+            "bytes": {},
+            "rss_delta_bytes": None,
+        })
+        entry["calls"] += 1
+        entry["seconds"] += m.seconds
+        for key in ("rows_in", "rows_out"):
+            value = getattr(m, key)
+            if value is not None:
+                entry[key] = (entry[key] or 0) + int(value)
+        for service, n in m.requests.items():
+            entry["requests"][service] = entry["requests"].get(service, 0) + n
+        for service, n in m.bytes.items():
+            entry["bytes"][service] = entry["bytes"].get(service, 0) + n
+        # mayor variación entre las llamadas de la etapa
+        if entry["rss_delta_bytes"] is None or m.rss_delta > entry["rss_delta_bytes"]:
+            entry["rss_delta_bytes"] = m.rss_delta
+
+    order = {name: i for i, name in enumerate(STAGES)}
+    stages = sorted(grouped.values(), key=lambda e: (order.get(e["stage"], len(order)), e["source"]))
+    for entry in stages:
+        rows = entry["rows_out"] if entry["rows_out"] is not None else entry["rows_in"]
+        entry["seconds"] = round(entry["seconds"], 6)
+        entry["rows_per_second"] = (
+            round(rows / entry["seconds"], 2) if rows and entry["seconds"] > 0 else None
+        )
+    return stages
+
+
+def report(status="ok"):
+    """Reporte de la corrida actual como dict serializable a JSON."""
+    with _lock:
+        stages = _aggregate()
+        services = {k: dict(v) for k, v in _run["services"].items()}
+        retries = dict(_run["retries"])
+        started_at = _run["started_at"]
+        seconds = time.perf_counter() - _run["started"] if started_at else 0.0
+        name = _run["name"]
+        mode = _run["mode"]
+
+    return {
+        "run": name,
+        "mode": mode,
+        "status": status,
+        "started_at": started_at.isoformat() if started_at else None,
+        "seconds": round(seconds, 6),
+        "peak_rss_bytes": peak_rss_bytes(),
+        "services": services,
+        "retries": retries,
+        "stages": stages,
+    }
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def prometheus_text(run_report):
+    """Formato de exposición de Prometheus (textfile collector)."""
+    mode = run_report["mode"]
+    lines = []
+
+    def metric(name, help_text, samples):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} gauge")
+        for labels, value in samples:
+            label_text = ",".join(f'{k}="{_label(v)}"' for k, v in {"mode": mode, **labels}.items())
+            lines.append(f"{name}{{{label_text}}} {value}")
+
+    stages = run_report["stages"]
+    started = datetime.fromisoformat(run_report["started_at"]).timestamp() if run_report["started_at"] else 0
+
+    metric("etl_run_success", "1 si la última corrida terminó sin errores ni rechazos",
+           [({}, int(run_report["status"] == "ok"))])
+    metric("etl_run_timestamp_seconds", "Inicio de la última corrida (epoch)",
+           [({}, round(started, 3))])
+    metric("etl_run_seconds", "Duración total de la última corrida",
+           [({}, run_report["seconds"])])
+    metric("etl_peak_rss_bytes", "Pico de memoria residente del proceso",
+           [({}, run_report["peak_rss_bytes"])])
+    metric("etl_service_requests", "Requests por servicio externo en la corrida",
+           [({"service": service}, v["requests"]) for service, v in run_report["services"].items()])
+    metric("etl_service_bytes", "Bytes de payload por servicio externo en la corrida",
+           [({"service": service}, v["bytes"]) for service, v in run_report["services"].items()])
+    metric("etl_service_retries", "Reintentos por servicio externo en la corrida",
+           [({"service": service}, n) for service, n in run_report["retries"].items()])
+    metric("etl_stage_seconds", "Tiempo de pared por fuente y etapa",
+           [({"source": s["source"], "stage": s["stage"]}, s["seconds"]) for s in stages])
+    metric("etl_stage_rows_in", "Filas de entrada por fuente y etapa",
+           [({"source": s["source"], "stage": s["stage"]}, s["rows_in"])
+            for s in stages if s["rows_in"] is not None])
+    metric("etl_stage_rows_out", "Filas de salida por fuente y etapa",
+           [({"source": s["source"], "stage": s["stage"]}, s["rows_out"])
+            for s in stages if s["rows_out"] is not None])
+    metric("etl_stage_rows_per_second", "Filas por segundo por fuente y etapa",
+           [({"source": s["source"], "stage": s["stage"]}, s["rows_per_second"])
+            for s in stages if s["rows_per_second"] is not None])
+    metric("etl_stage_requests", "Requests a servicios externos por fuente y etapa",
+           [({"source": s["source"], "stage": s["stage"], "service": service}, n)
+            for s in stages for service, n in s["requests"].items()])
+    metric("etl_stage_bytes", "Bytes de payload por servicio, fuente y etapa",
+           [({"source": s["source"], "stage": s["stage"], "service": service}, n)
+            for s in stages for service, n in s["bytes"].items()])
+    metric("etl_stage_rss_delta_bytes", "Mayor variación de RSS en una llamada de cada etapa",
+           [({"source": s["source"], "stage": s["stage"]}, s["rss_delta_bytes"]) for s in stages])
+
+    return "\n".join(lines) + "\n"
+
+
+def finish_run(status="ok"):
+    """Cerrar la corrida: escribir el reporte JSON y el textfile de
+    Prometheus, y retornar el reporte.
+    """
+    run_report = report(status)
+
+    try:
+        if METRICS_REPORT_PATH:
+            with atomic_open(METRICS_REPORT_PATH) as f:
+                json.dump(run_report, f, ensure_ascii=False, indent=2)
+        if METRICS_TEXTFILE_PATH:
+            with atomic_open(METRICS_TEXTFILE_PATH) as f:
+                f.write(prometheus_text(run_report))
+    except Exception:
+        # las métricas nunca hacen fallar la corrida
+        logger.exception("No se pudo escribir el reporte de métricas")
+
+    for s in run_report["stages"]:
+        logger.info(
+            f"{s['source']} | {s['stage']} | {s['seconds']:.3f}s | "
+            f"filas {s['rows_in']} -> {s['rows_out']} | "
+            f"requests {s['requests'] or '-'} | bytes {s['bytes'] or '-'}"
+        )
+    logger.info(
+        f"Corrida {run_report['run']} | {run_report['status']} | "
+        f"{run_report['seconds']:.2f}s | Pico RSS: "
+        f"{run_report['peak_rss_bytes'] / 1024 / 1024:.1f} MB"
+    )
+    return run_report
@@ -1,139 +1,476 @@
 import os
+import sys
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date
 from dotenv import load_dotenv
 
 from extract import (
-    extract_sheet_pc,
-    extract_sheet_pi,
-    extract_sheet_pi_2,
-    extract_sheet_pi_3
+    extract_source_range,
+    fetch_source_table,
+    invalidate_gspread_cache,
+    iter_source_chunks,
+    month_bounds,
+    plan_worksheet_reads,
+    sheet_columns
 )
-from transform import (
-    transform_ventas_peri_collection,
-    transform_ventas_peri_institute,
-    transform_ventas_peri_institute_2,
-    transform_ventas_peri_institute_3
+from transform import concat_frames, transform_source
+from load import (
+    StreamLoader,
+    concat_payloads,
+    load,
+    partition_payload,
+    payload_rows,
+    serialize
 )
-from load import load
+import metrics
+import replay
+import snapshot
+from sources import SOURCES, source_location
 from logger import get_logger
 
 logger = get_logger("PIPELINE")
 
 load_dotenv()
 
-def run_pipeline(year=None, month=None):
-    # =========================
-    # DEFINICIÓN DE PERIODO
-    # =========================
+# Máximo de hojas procesadas en paralelo (1 = secuencial)
+ETL_MAX_WORKERS = int(os.getenv("ETL_MAX_WORKERS", "4"))
+# Meses cargados en paralelo durante un backfill (cada uno usa su propio pool de lotes)
+BACKFILL_MAX_PERIODS = int(os.getenv("BACKFILL_MAX_PERIODS", "2"))
+# Streaming: las filas se extraen, transforman y cargan por bloques sin
+# armar el DataFrame consolidado (memoria acotada por el bloque)
+ETL_STREAMING = os.getenv("ETL_STREAMING", "0") == "1"
+STREAM_CHUNK_ROWS = int(os.getenv("STREAM_CHUNK_ROWS", "5000"))
+
+
+def _sheet_locations():
+    """(sheet_id, worksheet_name) de cada fuente registrada según las
+    variables de entorno.
+    """
+    return {source["name"]: source_location(source) for source in SOURCES}
+
+
+def _build_branches(start, end):
+    """Definir las ramas extract→transform de cada fuente registrada, en el
+    orden de consolidación final, para el periodo `[start, end)`.
+    """
+    sheets = _sheet_locations()
+
+    return [
+        {
+            "name": source["name"],
+            "title": f"Procesando hoja de {source['title']}",
+            # `source=source` fija la fuente de cada iteración en la lambda
+            "extract": lambda source=source: extract_source_range(
+                source,
+                *sheets[source["name"]],
+                start,
+                end
+            ),
+            "transform": lambda df, source=source: transform_source(df, source),
+            "empty_message": source["empty_message"],
+        }
+        for source in SOURCES
+    ]
+
+
+def _run_branch(branch):
+    logger.info(branch["title"])
+
+    df_raw = branch["extract"]()
+
+    if df_raw.empty:
+        logger.warning(branch["empty_message"])
+        return pd.DataFrame()
+
+    return branch["transform"](df_raw)
+
+
+def _run_branches(branches, max_workers):
+    """Ejecutar las ramas con un pool acotado de hilos.
+    Un error en una hoja no interrumpe a las demás; se retorna junto a los
+    resultados para decidir después.
+    """
+    results = {}
+    errors = {}
+
+    with ThreadPoolExecutor(
+        max_workers=max(1, max_workers),
+        thread_name_prefix="etl-sheet"
+    ) as executor:
+        futures = {
+            branch["name"]: executor.submit(_run_branch, branch)
+            for branch in branches
+        }
+
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                logger.exception(f"Error procesando hoja {name}")
+                errors[name] = e
+
+    return results, errors
+
+
+def _previous_month():
     today = date.today()
     if today.month == 1:
-        target_year = today.year - 1
-        target_month = 12
-    else:
-        target_year = today.year
-        target_month = today.month - 1
+        return today.year - 1, 12
+    return today.year, today.month - 1
 
-    logger.info(
-        f"===== ETL MENSUAL | Periodo: {target_year}-{target_month:02d} ====="
+
+def _prepare_reads(refresh):
+    """Preparar la lectura de las hojas de una corrida."""
+    # un único cliente autenticado y spreadsheets abiertos para toda la corrida
+    invalidate_gspread_cache()
+    # refresh=True ignora los snapshots locales y vuelve a descargar todo;
+    # al grabar/reproducir E/S las lecturas deben ser completas y repetibles
+    snapshot.set_force_refresh(refresh or replay.active())
+    # hojas de un mismo spreadsheet (PI2 y PI3) se leen en una sola llamada
+    plan_worksheet_reads(
+        (*location, sheet_columns(name))
+        for name, location in _sheet_locations().items()
     )
 
 
+def _extract_period(start, end, max_workers, refresh):
+    """Extraer y transformar todas las fuentes para `[start, end)` con una
+    sola lectura por hoja. Retorna el DataFrame consolidado.
+    """
+    _prepare_reads(refresh)
+
     # =========================
-    # HOJA 1 – VENTAS PC
+    # EXTRACCIÓN + TRANSFORMACIÓN POR HOJA
     # =========================
-    logger.info("Procesando hoja de VENTAS Peri Collection")
-
-    df_sales_pc_raw = extract_sheet_pc(
-        os.getenv("PERSYS_SHEET_ID"),
-        os.getenv("WORKSHEET_NAME_1"),
-        "sales",
-        target_year,
-        target_month
-    )
+    branches = _build_branches(start, end)
+    results, errors = _run_branches(branches, max_workers)
 
-    if df_sales_pc_raw.empty:
-        logger.warning("No hay ventas este mes")
-        df_sales_pc_final = pd.DataFrame()
-    else:
-        df_sales_pc_final = transform_ventas_peri_collection(df_sales_pc_raw)
+    if errors:
+        # no se carga un periodo incompleto: las hojas correctas ya terminaron,
+        # pero el periodo se reprocesa completo
+        raise RuntimeError(
+            f"Fallaron {len(errors)} hoja(s): {', '.join(errors)}. "
+            "No se cargan datos parciales."
+        )
 
     # =========================
-    # HOJA 2 – ventas PI
+    # CONSOLIDACIÓN FINAL
     # =========================
- 
-    logger.info("Procesando hoja de VENTAS Peri Institute")
-
-    df_sales_pi_raw = extract_sheet_pi(
-        os.getenv("PROTO_INSTITUTE_ID"),
-        os.getenv("WORKSHEET_NAME_2"),
-        target_year,
-        target_month
-    )
+    frames = [results[branch["name"]] for branch in branches]
+    with metrics.stage("all", "concat", rows_in=sum(len(f) for f in frames)) as m:
+        df_final = concat_frames(frames)
+        m.rows_out = len(df_final)
 
-    if df_sales_pi_raw.empty:
-        logger.warning("No hay ingresos este mes")
-        df_sales_pi_final = pd.DataFrame()
-    else:
-        df_sales_pi_final = transform_ventas_peri_institute(df_sales_pi_raw)
+    logger.info(f"Total registros consolidados: {len(df_final)}")
+    return df_final
+
+
+def _stream_period(start, end, max_workers, refresh, chunk_rows):
+    """Versión streaming de `_extract_period`: genera bloques transformados
+    de cada fuente, en el orden de consolidación, a medida que se procesan.
+
+    Las hojas se descargan en segundo plano, hasta `max_workers` a la vez
+    y en orden, mientras se procesa la actual. Un error en una hoja se
+    propaga al consumidor; los bloques ya entregados no se deshacen.
+    """
+    _prepare_reads(refresh)
+    sheets = _sheet_locations()
+    pending = {}
+
+    with ThreadPoolExecutor(
+        max_workers=max(1, max_workers),
+        thread_name_prefix="etl-sheet"
+    ) as executor:
+        def prefetch(i):
+            if i < len(SOURCES) and i not in pending:
+                source = SOURCES[i]
+                pending[i] = executor.submit(
+                    metrics.in_context(fetch_source_table),
+                    source, *sheets[source["name"]]
+                )
+
+        for i, source in enumerate(SOURCES):
+            for ahead in range(i, i + max(1, max_workers)):
+                prefetch(ahead)
+
+            logger.info(f"Procesando hoja de {source['title']} (streaming)")
+            headers, rows = pending.pop(i).result()
+            n_chunks = 0
+            for chunk in iter_source_chunks(source, headers, rows, start, end, chunk_rows):
+                n_chunks += 1
+                yield transform_source(chunk, source)
+            del rows
 
+            if not n_chunks:
+                logger.warning(source["empty_message"])
+
+
+def _log_rejections(report):
+    for rej in report["rejected"]:
+        logger.warning(
+            f"Rechazado índice {rej['index']} | "
+            f"id_referenced: {rej['record'].get('id_referenced')} | {rej['error']}"
+        )
+
+
+def run_pipeline(year=None, month=None, max_workers=None, refresh=False,
+                 streaming=None):
     # =========================
-    # HOJA 3 – ventas hoja antigua PI
+    # DEFINICIÓN DE PERIODO
     # =========================
- 
-    logger.info("Procesando hoja de VENTAS Peri Institute 2")
-
-    df_sales_pi2_raw = extract_sheet_pi_2(
-        os.getenv("Matricula_PI_ID"),
-        os.getenv("WORKSHEET_NAME_3"),
-        target_year,
-        target_month
+    # por defecto se procesa el mes anterior
+    if year is None or month is None:
+        target_year, target_month = _previous_month()
+    else:
+        target_year, target_month = year, month
+
+    if max_workers is None:
+        max_workers = ETL_MAX_WORKERS
+    if streaming is None:
+        streaming = ETL_STREAMING
+
+    logger.info(
+        f"===== ETL MENSUAL | Periodo: {target_year}-{target_month:02d}"
+        f"{' | Streaming' if streaming else ''} ====="
     )
 
-    if df_sales_pi2_raw.empty:
-        logger.warning("No hay ingresos este mes")
-        df_sales_pi2_final = pd.DataFrame()
-    else:
-        df_sales_pi2_final = transform_ventas_peri_institute_2(df_sales_pi2_raw)
+    # ETL_IO_MODE=record/replay graba o reproduce la E/S de Sheets y Supabase
+    replay.install()
+    metrics.start_run(f"mensual {target_year}-{target_month:02d}", "mensual")
+    try:
+        if streaming:
+            report = _stream_month(target_year, target_month, max_workers, refresh)
+        else:
+            report = _run_month(target_year, target_month, max_workers, refresh)
+    except Exception:
+        metrics.finish_run("error")
+        raise
+    metrics.finish_run("ok" if not report or not report["rejected"] else "rejected")
+    return report
+
+
+def _run_month(target_year, target_month, max_workers, refresh):
+    df_final = _extract_period(
+        *month_bounds(target_year, target_month), max_workers, refresh
+    )
+
+    if df_final.empty:
+        logger.warning("No hay datos para cargar este mes")
+        return
+
+    report = load(df_final)
+    return _finish_month(report)
+
+
+def _stream_month(target_year, target_month, max_workers, refresh):
+    """Mes en streaming: cada bloque transformado se entrega al cargador
+    apenas está listo, solapando descarga, transformación y carga. Si una
+    hoja falla, lo ya enviado queda cargado (reprocesar con LOAD_MODE=upsert).
+    """
+    loader = StreamLoader()
+    chunks = _stream_period(
+        *month_bounds(target_year, target_month),
+        max_workers, refresh, STREAM_CHUNK_ROWS
+    )
+    try:
+        for chunk in chunks:
+            loader.send(chunk)
+    except Exception:
+        chunks.close()
+        loader.close()
+        logger.error(
+            f"Streaming interrumpido tras enviar {loader.total} registros; "
+            "los lotes enviados quedaron cargados"
+        )
+        raise
+
+    report = loader.close()
+    if not report["total"]:
+        logger.warning("No hay datos para cargar este mes")
+        return
+    return _finish_month(report)
+
+
+def _finish_month(report):
+    if report["rejected"]:
+        _log_rejections(report)
+        logger.warning(
+            f"===== ETL MENSUAL FINALIZADO CON {len(report['rejected'])} RECHAZO(S) ====="
+        )
+        return report
+
+    logger.info("===== ETL MENSUAL FINALIZADO CORRECTAMENTE =====")
+    return report
+
+
+def run_backfill(first_period, last_period, max_workers=None,
+                 max_periods=None, refresh=False, streaming=None):
+    """Reprocesar un rango de meses (ambos inclusive, p. ej. `"2024-01"` a
+    `"2024-12"`) leyendo cada hoja una sola vez.
+
+    Las filas de todo el rango se extraen y transforman juntas, se separan
+    por año-mes en una sola pasada y cada mes se carga como un lote propio,
+    hasta `max_periods` meses a la vez. Un mes que falla no detiene a los
+    demás. Retorna el reporte de carga de cada mes.
+
+    En streaming (`ETL_STREAMING`) cada bloque se separa por año-mes y
+    cada parte va al cargador de su mes; todos los meses cargan a la vez
+    (`max_periods` no aplica).
+    """
+    first = pd.Period(first_period, freq="M")
+    last = pd.Period(last_period, freq="M")
+    if last < first:
+        raise ValueError(f"Rango de backfill inválido: {first} a {last}")
+
+    if max_workers is None:
+        max_workers = ETL_MAX_WORKERS
+    max_periods = max(1, max_periods or BACKFILL_MAX_PERIODS)
+    if streaming is None:
+        streaming = ETL_STREAMING
+
+    logger.info(
+        f"===== ETL BACKFILL | Periodos: {first} a {last}"
+        f"{' | Streaming' if streaming else ''} ====="
+    )
+
+    replay.install()
+    metrics.start_run(f"backfill {first} a {last}", "backfill")
+    try:
+        if streaming:
+            reports = _stream_periods(first, last, max_workers, refresh)
+        else:
+            reports = _run_periods(first, last, max_workers, max_periods, refresh)
+    except Exception:
+        metrics.finish_run("error")
+        raise
+    rejected = sum(len(r["rejected"]) for r in reports.values())
+    metrics.finish_run("rejected" if rejected else "ok")
+    return reports
+
+
+def _run_periods(first, last, max_workers, max_periods, refresh):
+    df_all = _extract_period(
+        first.start_time, (last + 1).start_time, max_workers, refresh
+    )
 
     # =========================
-    # HOJA 4 – ventas hoja matricula antigua PI
+    # PARTICIÓN POR PERIODO
     # =========================
- 
-    logger.info("Procesando hoja de VENTAS Peri Institute 3")
-
-    df_sales_pi3_raw = extract_sheet_pi_3(
-        os.getenv("Matricula_PI_ID"),
-        os.getenv("WORKSHEET_NAME_4"),
-        target_year,
-        target_month
-    )
+    periods = {}
+    if not df_all.empty:
+        keys = df_all["date"].dt.to_period("M")
+        periods = {
+            period: frame.reset_index(drop=True)
+            for period, frame in df_all.groupby(keys, sort=True, observed=True)
+        }
 
-    if df_sales_pi3_raw.empty:
-        logger.warning("No hay ingresos este mes")
-        df_sales_pi3_final = pd.DataFrame()
-    else:
-        df_sales_pi3_final = transform_ventas_peri_institute_3(df_sales_pi3_raw)
+    for period in pd.period_range(first, last, freq="M"):
+        if period not in periods:
+            logger.warning(f"No hay datos para cargar en {period}")
 
-        
     # =========================
-    # CONSOLIDACIÓN FINAL
+    # CARGA POR PERIODO
     # =========================
-    df_final = pd.concat(
-        [df_sales_pi_final, df_sales_pc_final, df_sales_pi2_final, df_sales_pi3_final],
-        ignore_index=True
+    reports = {}
+    errors = {}
+    with ThreadPoolExecutor(
+        max_workers=max_periods,
+        thread_name_prefix="etl-period"
+    ) as executor:
+        futures = {
+            period: executor.submit(metrics.in_context(load), frame)
+            for period, frame in periods.items()
+        }
+
+        for period, future in futures.items():
+            try:
+                reports[str(period)] = future.result()
+            except Exception as e:
+                logger.exception(f"Error cargando periodo {period}")
+                errors[str(period)] = e
+
+    return _finish_periods(reports, errors)
+
+
+def _stream_periods(first, last, max_workers, refresh):
+    # en streaming todos los meses del rango se cargan a la vez; los requests
+    # simultáneos quedan acotados por el planificador (`scheduler`)
+    loaders = {}
+    # cada bloque trae filas de varios meses: se serializa una sola vez, se
+    # separa por mes y las partes se acumulan hasta juntar un bloque completo
+    buffers = {}
+
+    def flush(period):
+        parts = buffers.pop(period, [])
+        if parts:
+            if period not in loaders:
+                loaders[period] = StreamLoader()
+            loaders[period].send_payload(concat_payloads(parts))
+
+    chunks = _stream_period(
+        first.start_time, (last + 1).start_time,
+        max_workers, refresh, STREAM_CHUNK_ROWS
     )
+    try:
+        for chunk in chunks:
+            payload = serialize(chunk)
+            keys = chunk["date"].dt.to_period("M")
+            for period, part in partition_payload(payload, keys).items():
+                buffers.setdefault(period, []).append(part)
+                if sum(payload_rows(p) for p in buffers[period]) >= STREAM_CHUNK_ROWS:
+                    flush(period)
+        for period in list(buffers):
+            flush(period)
+    except Exception:
+        chunks.close()
+        for loader in loaders.values():
+            loader.close()
+        logger.error("Streaming interrumpido; los lotes enviados quedaron cargados")
+        raise
 
-    logger.info(f"Total registros consolidados: {len(df_final)}")
+    for period in pd.period_range(first, last, freq="M"):
+        if period not in loaders:
+            logger.warning(f"No hay datos para cargar en {period}")
 
-    if df_final.empty:
-        logger.warning("No hay datos para cargar este mes")
-        return
+    reports = {str(period): loaders[period].close() for period in sorted(loaders)}
+    return _finish_periods(reports, {})
 
-    load(df_final)
 
-    logger.info("===== ETL MENSUAL FINALIZADO CORRECTAMENTE =====")
+def _finish_periods(reports, errors):
+    rejected = 0
+    for period, report in reports.items():
+        _log_rejections(report)
+        rejected += len(report["rejected"])
+        logger.info(
+            f"Periodo {period} | Registros: {report['total']} | "
+            f"Escritos: {report['written']} | Rechazados: {len(report['rejected'])}"
+        )
+
+    if errors:
+        raise RuntimeError(
+            f"Falló la carga de {len(errors)} periodo(s): {', '.join(errors)}. "
+            "Los demás periodos quedaron cargados."
+        )
+
+    if rejected:
+        logger.warning(f"===== ETL BACKFILL FINALIZADO CON {rejected} RECHAZO(S) =====")
+    else:
+        logger.info("===== ETL BACKFILL FINALIZADO CORRECTAMENTE =====")
+    return reports
 
 
 if __name__ == "__main__":
-    run_pipeline()
+    # python pipeline.py                    -> mes anterior
+    # python pipeline.py 2024-01 2024-12    -> backfill del rango
+    # --refresh ignora los snapshots locales y vuelve a descargar las hojas
+    # ETL_STREAMING=1 procesa y carga por bloques de STREAM_CHUNK_ROWS filas
+    # sale con código 1 si alguna fila fue rechazada (los errores propagan)
+    refresh = "--refresh" in sys.argv[1:]
+    args = [a for a in sys.argv[1:] if a != "--refresh"]
+    if len(args) == 2:
+        reports = run_backfill(args[0], args[1], refresh=refresh)
+    else:
+        reports = {"mensual": run_pipeline(refresh=refresh)}
+    if any(report and report["rejected"] for report in reports.values()):
+        sys.exit(1)
@@ -0,0 +1,309 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+
+import extract
+import load
+import scheduler
+from fileio import atomic_open
+from logger import get_logger
+
+logger = get_logger("REPLAY")
+
+# =========================
+# CONFIGURACIÓN
+# =========================
+# "live" (por defecto), "record" (graba la E/S real) o "replay" (sin red)
+ETL_IO_MODE = os.getenv("ETL_IO_MODE", "live")
+REPLAY_DIR = os.getenv(
+    "REPLAY_DIR", os.path.join(os.getenv("ETL_CACHE_DIR", ".etl_cache"), "replay")
+)
+# Latencia simulada al reproducir: "" (ninguna), "recorded" (la medida al
+# grabar) o segundos fijos por llamada
+REPLAY_LATENCY = os.getenv("REPLAY_LATENCY", "")
+
+_install_lock = threading.Lock()
+_installed = {"mode": None}
+
+
+def active():
+    """True si la E/S se graba o se reproduce (requiere lecturas completas
+    y deterministas: sin snapshots locales).
+    """
+    return ETL_IO_MODE in ("record", "replay")
+
+
+def _key(parts):
+    payload = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class _Store:
+    """Grabaciones por servicio: un archivo gzip JSON por llamada distinta
+    (misma clave), con la lista de respuestas en orden.
+    """
+
+    def __init__(self, service):
+        self.directory = os.path.join(REPLAY_DIR, service)
+        self._lock = threading.Lock()
+        self._recorded = {}
+        self._cursor = {}
+        self._loaded = {}
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json.gz")
+
+    def record(self, parts, call, **info):
+        key = _key(parts)
+        with self._lock:
+            data = self._recorded.setdefault(key, {**info, "calls": []})
+            data["calls"].append(call)
+            with atomic_open(self._path(key), compress=True) as f:
+                json.dump(data, f, ensure_ascii=False, default=str)
+
+    def next_call(self, parts):
+        """Siguiente respuesta grabada para la llamada (la última se repite),
+        o None si no hay grabación.
+        """
+        key = _key(parts)
+        with self._lock:
+            if key not in self._loaded:
+                try:
+                    with gzip.open(self._path(key), "rt", encoding="utf-8") as f:
+                        self._loaded[key] = json.load(f)["calls"]
+                except FileNotFoundError:
+                    self._loaded[key] = None
+            calls = self._loaded[key]
+            if not calls:
+                return None
+            i = self._cursor.get(key, 0)
+            self._cursor[key] = i + 1
+            return calls[min(i, len(calls) - 1)]
+
+
+def _simulate_latency(call):
+    if not REPLAY_LATENCY:
+        return
+    seconds = call.get("seconds", 0.0) if REPLAY_LATENCY == "recorded" else float(REPLAY_LATENCY)
+    if seconds > 0:
+        time.sleep(seconds)
+
+
+# =========================
+# GOOGLE SHEETS
+# =========================
+class RecordingSpreadsheet:
+    """Envuelve un spreadsheet real y graba las respuestas de `values_batch_get`."""
+
+    def __init__(self, spreadsheet, store):
+        self._spreadsheet = spreadsheet
+        self._store = store
+        self.id = spreadsheet.id
+
+    def values_batch_get(self, ranges, params=None):
+        started = time.perf_counter()
+        response = self._spreadsheet.values_batch_get(ranges, params=params)
+        self._store.record(
+            ["values_batch_get", self.id, list(ranges), params],
+            {"response": response, "seconds": time.perf_counter() - started},
+            sheet_id=self.id, ranges=list(ranges)
+        )
+        return response
+
+    def __getattr__(self, name):
+        return getattr(self._spreadsheet, name)
+
+
+class RecordingGspreadClient:
+    def __init__(self, client, store):
+        self._client = client
+        self._store = store
+
+    def open_by_key(self, key):
+        started = time.perf_counter()
+        spreadsheet = self._client.open_by_key(key)
+        self._store.record(
+            ["open_by_key", key],
+            {"seconds": time.perf_counter() - started},
+            sheet_id=key
+        )
+        return RecordingSpreadsheet(spreadsheet, self._store)
+
+
+class ReplaySpreadsheet:
+    def __init__(self, sheet_id, store):
+        self.id = sheet_id
+        self._store = store
+
+    def values_batch_get(self, ranges, params=None):
+        call = self._store.next_call(["values_batch_get", self.id, list(ranges), params])
+        if call is None:
+            raise LookupError(
+                f"Sin grabación de Sheets para {self.id} {list(ranges)}; "
+                "grabar con ETL_IO_MODE=record"
+            )
+        _simulate_latency(call)
+        return call["response"]
+
+
+class ReplayGspreadClient:
+    def __init__(self, store):
+        self._store = store
+
+    def open_by_key(self, key):
+        call = self._store.next_call(["open_by_key", key])
+        if call is None:
+            raise LookupError(f"Sin grabación del spreadsheet {key}")
+        _simulate_latency(call)
+        return ReplaySpreadsheet(key, self._store)
+
+
+# =========================
+# SUPABASE
+# =========================
+class _Response:
+    def __init__(self, data):
+        self.data = data
+
+
+class _Query:
+    """Constructor de consultas que registra la operación y delega la
+    ejecución en el cliente de grabación o reproducción.
+    """
+
+    def __init__(self, client, table):
+        self._client = client
+        self.table = table
+        self.operation = None
+        self.payload = None
+        self.options = {}
+        self.filters = []
+
+    def insert(self, records, **options):
+        self.operation, self.payload, self.options = "insert", records, options
+        return self
+
+    def upsert(self, records, **options):
+        self.operation, self.payload, self.options = "upsert", records, options
+        return self
+
+    def select(self, columns="*", **options):
+        self.operation, self.payload, self.options = "select", columns, options
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(["eq", column, value])
+        return self
+
+    def in_(self, column, values):
+        self.filters.append(["in_", column, list(values)])
+        return self
+
+    def parts(self):
+        return [self.table, self.operation, self.payload, self.options, self.filters]
+
+    def execute(self):
+        return self._client._execute(self)
+
+
+class RecordingSupabase:
+    """Envuelve el cliente real: reenvía cada consulta y graba el payload,
+    la respuesta (o el error) y la latencia.
+    """
+
+    def __init__(self, client, store):
+        self._client = client
+        self._store = store
+
+    def table(self, name):
+        return _Query(self, name)
+
+    def _execute(self, query):
+        real = self._client.table(query.table)
+        real = getattr(real, query.operation)(query.payload, **query.options)
+        for method, column, value in query.filters:
+            real = getattr(real, method)(column, value)
+
+        started = time.perf_counter()
+        call = {}
+        try:
+            response = real.execute()
+            call["data"] = response.data
+            return response
+        except Exception as e:
+            call["error"] = str(e)
+            raise
+        finally:
+            call["seconds"] = time.perf_counter() - started
+            self._store.record(
+                query.parts(), call,
+                table=query.table, operation=query.operation, payload=query.payload
+            )
+
+
+class ReplaySupabase:
+    """Reproduce las respuestas grabadas. Una escritura sin grabación
+    exacta (p. ej. lotes de otro tamaño) responde como escrita completa;
+    una lectura sin grabación responde vacía.
+    """
+
+    def __init__(self, store):
+        self._store = store
+
+    def table(self, name):
+        return _Query(self, name)
+
+    def _execute(self, query):
+        call = self._store.next_call(query.parts())
+        if call is None:
+            if query.operation == "select":
+                return _Response([])
+            records = query.payload if isinstance(query.payload, list) else [query.payload]
+            return _Response(records)
+
+        _simulate_latency(call)
+        if "error" in call:
+            raise Exception(call["error"])
+        return _Response(call["data"])
+
+
+# =========================
+# INSTALACIÓN
+# =========================
+def install(mode=None):
+    """Conectar extract/load al modo de E/S configurado (`ETL_IO_MODE`).
+    En "live" no se modifica nada.
+    """
+    mode = mode or ETL_IO_MODE
+    if mode not in ("live", "record", "replay"):
+        raise ValueError(f"Modo de E/S no soportado: {mode}")
+
+    with _install_lock:
+        if _installed["mode"] == mode:
+            return
+        _installed["mode"] = mode
+
+        if mode == "live":
+            return
+
+        sheets = _Store("sheets")
+        supabase = _Store("supabase")
+
+        if mode == "record":
+            extract.set_gspread_client_factory(
+                lambda: RecordingGspreadClient(extract.service_account_client(), sheets)
+            )
+            load.set_supabase_client(RecordingSupabase(load.create_supabase_client(), supabase))
+        else:
+            extract.set_gspread_client_factory(lambda: ReplayGspreadClient(sheets))
+            load.set_supabase_client(ReplaySupabase(supabase))
+            # sin red no hay cuota: la latencia se controla con REPLAY_LATENCY
+            scheduler.set_rate_limiting(False)
+
+        logger.info(
+            f"E/S en modo {mode} | Directorio: {REPLAY_DIR}"
+            + (f" | Latencia simulada: {REPLAY_LATENCY}" if mode == "replay" and REPLAY_LATENCY else "")
+        )
@@ -0,0 +1,210 @@
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import metrics
+from logger import get_logger
+
+try:
+    import requests
+except ImportError:  # gspread depende de requests; se tolera su ausencia
+    requests = None
+
+try:
+    import httpx
+except ImportError:  # supabase/postgrest depende de httpx
+    httpx = None
+
+logger = get_logger("SCHEDULER")
+
+# =========================
+# CONFIGURACIÓN
+# =========================
+# Requests por segundo sostenidos y ráfaga máxima por servicio
+SERVICE_LIMITS = {
+    # cuota de lectura de Sheets: 60 requests/min por usuario
+    "sheets": (
+        float(os.getenv("SHEETS_RATE_PER_SEC", "1.0")),
+        int(os.getenv("SHEETS_BURST", "10")),
+    ),
+    "supabase": (
+        float(os.getenv("SUPABASE_RATE_PER_SEC", "10.0")),
+        int(os.getenv("SUPABASE_BURST", "20")),
+    ),
+}
+# Requests simultáneos como máximo, sumando todos los servicios
+ETL_MAX_CONCURRENT_REQUESTS = int(os.getenv("ETL_MAX_CONCURRENT_REQUESTS", "8"))
+RETRY_MAX_ATTEMPTS = int(os.getenv("RETRY_MAX_ATTEMPTS", "5"))
+RETRY_BASE_SECONDS = float(os.getenv("RETRY_BASE_SECONDS", "0.5"))
+RETRY_MAX_SECONDS = float(os.getenv("RETRY_MAX_SECONDS", "60"))
+
+# Códigos HTTP transitorios: la llamada se reintenta
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+# Códigos con los que el servidor no procesó el request: se reintentan
+# también las llamadas no idempotentes (inserts)
+UNPROCESSED_STATUS = {429, 503}
+
+
+class TokenBucket:
+    """Limitador por servicio: `rate` tokens por segundo hasta `capacity`.
+    Un Retry-After pausa el bucket para todos los hilos que lo usan.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now >= self.paused_until:
+                    self.tokens = min(
+                        self.capacity, self.tokens + (now - self.updated) * self.rate
+                    )
+                    self.updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate if self.rate > 0 else 0.1
+                else:
+                    wait = self.paused_until - now
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        with self._lock:
+            resume = time.monotonic() + seconds
+            if resume > self.paused_until:
+                self.paused_until = resume
+                # al reanudar no se dispara una ráfaga acumulada
+                self.tokens = 0.0
+                self.updated = resume
+
+
+_buckets = {name: TokenBucket(*limits) for name, limits in SERVICE_LIMITS.items()}
+_rate_limiting = {"enabled": True}
+_concurrency = threading.BoundedSemaphore(max(1, ETL_MAX_CONCURRENT_REQUESTS))
+
+
+def set_rate_limiting(enabled):
+    """Activar o desactivar los token buckets (p. ej. al reproducir E/S
+    grabada o en benchmarks, donde no hay cuota que cuidar). Los reintentos
+    y el límite de concurrencia se mantienen.
+    """
+    _rate_limiting["enabled"] = bool(enabled)
+
+
+def _response(exc):
+    return getattr(exc, "response", None)
+
+
+def _status(exc):
+    """Código HTTP de un error de gspread (requests), httpx o postgrest."""
+    status = getattr(_response(exc), "status_code", None)
+    if status is None:
+        # postgrest.APIError expone el código en `code` (HTTP o PGRST)
+        code = getattr(exc, "code", None)
+        try:
+            status = int(code)
+        except (TypeError, ValueError):
+            status = None
+    return status
+
+
+def _retry_after(exc):
+    """Segundos indicados por el header Retry-After, si viene."""
+    headers = getattr(_response(exc), "headers", None) or {}
+    value = headers.get("Retry-After") or headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _is_transport_error(exc):
+    if requests is not None and isinstance(
+        exc, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+    ):
+        return True
+    if httpx is not None and isinstance(exc, httpx.TransportError):
+        return True
+    return isinstance(exc, (ConnectionError, TimeoutError))
+
+
+def _is_connect_error(exc):
+    """Error al establecer la conexión: el request no llegó a enviarse."""
+    if requests is not None and isinstance(exc, requests.exceptions.ConnectTimeout):
+        return True
+    if httpx is not None and isinstance(exc, (httpx.ConnectError, httpx.ConnectTimeout)):
+        return True
+    return isinstance(exc, ConnectionRefusedError)
+
+
+def is_retryable(exc):
+    return _status(exc) in RETRYABLE_STATUS or _is_transport_error(exc)
+
+
+def is_unprocessed(exc):
+    """El request seguro no se procesó (conexión rechazada, 429, 503); un
+    timeout o un 500/502/504 pueden llegar después de aplicado.
+    """
+    return _status(exc) in UNPROCESSED_STATUS or _is_connect_error(exc)
+
+
+def backoff_seconds(attempt):
+    """Backoff exponencial con jitter completo para el intento `attempt` (1..n)."""
+    return random.uniform(0, min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** (attempt - 1)))
+
+
+def call(service, fn, *args, idempotent=True, **kwargs):
+    """Ejecutar una llamada saliente a `service` ("sheets", "supabase")
+    respetando su token bucket y el límite global de concurrencia.
+
+    Los errores transitorios (429, 5xx, red) se reintentan hasta
+    `RETRY_MAX_ATTEMPTS` veces con backoff exponencial con jitter, o lo que
+    indique Retry-After (que además pausa el servicio para todos los hilos).
+    Con `idempotent=False` (inserts) solo se reintentan los errores en los
+    que el request no se procesó (`is_unprocessed`): repetir un insert tras
+    un timeout puede duplicar filas. Los demás errores se propagan de
+    inmediato.
+    """
+    retryable = is_retryable if idempotent else is_unprocessed
+    bucket = _buckets.get(service) if _rate_limiting["enabled"] else None
+    attempt = 0
+    while True:
+        attempt += 1
+        if bucket is not None:
+            bucket.acquire()
+        with _concurrency:
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                if attempt >= RETRY_MAX_ATTEMPTS or not retryable(e):
+                    raise
+                error = e
+
+        # la espera se hace fuera del semáforo para no bloquear a otros
+        retry_after = _retry_after(error)
+        delay = retry_after if retry_after is not None else backoff_seconds(attempt)
+        if retry_after is not None and bucket is not None:
+            bucket.pause(retry_after)
+
+        metrics.count_retry(service)
+        logger.warning(
+            f"{service} | intento {attempt}/{RETRY_MAX_ATTEMPTS} falló "
+            f"(HTTP {_status(error) or '-'}: {type(error).__name__}); "
+            f"reintentando en {delay:.2f}s"
+        )
+        time.sleep(delay)
@@ -0,0 +1,139 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+from fileio import atomic_open
+from logger import get_logger
+
+logger = get_logger("SCHEMA")
+
+# =========================
+# CONFIGURACIÓN
+# =========================
+# Archivo con las resoluciones de columnas por cabecera ("" = solo en memoria)
+SCHEMA_CACHE_PATH = os.getenv(
+    "SCHEMA_CACHE_PATH",
+    os.path.join(os.getenv("ETL_CACHE_DIR", ".etl_cache"), "column_schemas.json")
+)
+# Cabeceras distintas que se conservan; se descartan primero las menos usadas
+SCHEMA_CACHE_MAX_ENTRIES = int(os.getenv("SCHEMA_CACHE_MAX_ENTRIES", "200"))
+
+_lock = threading.Lock()
+# fingerprint -> {"headers", "resolved": {clave: resultado}, "used_at"}
+_schemas = {}
+# "sheet_id/hoja" -> fingerprint de la última cabecera vista
+_locations = {}
+_state = {"loaded": False}
+
+
+def fingerprint(headers):
+    """Huella de una fila de cabecera tal como viene de la hoja."""
+    payload = json.dumps([str(h) for h in headers], ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def _load():
+    """Cargar el archivo persistido una sola vez por proceso (con `_lock`)."""
+    if _state["loaded"]:
+        return
+    _state["loaded"] = True
+    if not SCHEMA_CACHE_PATH:
+        return
+    try:
+        with open(SCHEMA_CACHE_PATH, encoding="utf-8") as f:
+            data = json.load(f)
+        _schemas.update(data.get("schemas", {}))
+        _locations.update(data.get("locations", {}))
+    except FileNotFoundError:
+        pass
+    except Exception:
+        logger.warning(f"Cache de cabeceras ilegible, se descarta: {SCHEMA_CACHE_PATH}")
+
+
+def _save():
+    """Persistir el cache (con `_lock`), descartando las cabeceras menos
+    usadas que no sean las vigentes de alguna hoja.
+    """
+    if not SCHEMA_CACHE_PATH:
+        return
+
+    current = set(_locations.values())
+    stale = sorted(
+        (entry.get("used_at", 0), fp) for fp, entry in _schemas.items() if fp not in current
+    )
+    for _, fp in stale[:max(0, len(_schemas) - SCHEMA_CACHE_MAX_ENTRIES)]:
+        del _schemas[fp]
+
+    try:
+        with atomic_open(SCHEMA_CACHE_PATH) as f:
+            json.dump(
+                {"schemas": _schemas, "locations": _locations},
+                f, ensure_ascii=False, separators=(",", ":")
+            )
+    except Exception:
+        logger.exception(f"No se pudo guardar el cache de cabeceras: {SCHEMA_CACHE_PATH}")
+
+
+def resolve(headers, key, compute):
+    """Resultado de `compute()` para la cabecera `headers` y la consulta
+    `key` (p. ej. los candidatos de una columna). Se calcula una sola vez
+    por huella de cabecera; el resultado debe ser serializable a JSON.
+    """
+    fp = fingerprint(headers)
+    key = json.dumps(key, ensure_ascii=False)
+    with _lock:
+        _load()
+        entry = _schemas.get(fp)
+        if entry is not None and key in entry["resolved"]:
+            entry["used_at"] = time.time()
+            return entry["resolved"][key]
+
+    value = compute()
+
+    with _lock:
+        entry = _schemas.setdefault(
+            fp, {"headers": [str(h) for h in headers], "resolved": {}}
+        )
+        entry["resolved"][key] = value
+        entry["used_at"] = time.time()
+        _save()
+    return value
+
+
+def observe(sheet_id, worksheet_name, headers):
+    """Registrar la cabecera vigente de una hoja. Si cambió respecto de la
+    última corrida se loguean las columnas agregadas, eliminadas o movidas;
+    las resoluciones de la cabecera nueva se calculan desde cero.
+    """
+    location = f"{sheet_id}/{worksheet_name}"
+    fp = fingerprint(headers)
+    with _lock:
+        _load()
+        previous = _locations.get(location)
+        if previous == fp:
+            return
+        _locations[location] = fp
+        _schemas.setdefault(fp, {"headers": [str(h) for h in headers], "resolved": {}})
+        _schemas[fp]["used_at"] = time.time()
+        old = _schemas.get(previous, {}).get("headers") if previous else None
+        _save()
+
+    if previous is None:
+        return
+    if old is None:
+        logger.warning(f"Cabecera modificada | Hoja: {worksheet_name} | Sheet: {sheet_id}")
+        return
+
+    new = [str(h) for h in headers]
+    added = [h for h in new if h not in old]
+    removed = [h for h in old if h not in new]
+    moved = [
+        h for h in new
+        if h in old and old.index(h) != new.index(h)
+    ]
+    logger.warning(
+        f"Cabecera modificada | Hoja: {worksheet_name} | Sheet: {sheet_id} | "
+        f"Agregadas: {added} | Eliminadas: {removed} | Movidas: {moved}"
+    )
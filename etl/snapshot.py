@@ -0,0 +1,211 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+
+from fileio import atomic_open
+from logger import get_logger
+
+logger = get_logger("SNAPSHOT")
+
+# =========================
+# CONFIGURACIÓN
+# =========================
+# Cache local de los valores leídos de Google Sheets (1 = activada). Los
+# snapshots se validan con el modifiedTime de Drive del spreadsheet, lo que
+# requiere el scope drive.metadata.readonly en la cuenta de servicio
+SNAPSHOT_ENABLED = os.getenv("SHEETS_SNAPSHOT_CACHE", "0") == "1"
+SNAPSHOT_DIR = os.path.join(os.getenv("ETL_CACHE_DIR", ".etl_cache"), "snapshots")
+# Antigüedad bajo la cual un snapshot se usa aunque la hoja haya cambiado
+# (0 = siempre se valida contra modifiedTime)
+SNAPSHOT_TRUST_SECONDS = int(os.getenv("SNAPSHOT_TRUST_SECONDS", "0"))
+# Antigüedad máxima; snapshots más viejos se eliminan
+SNAPSHOT_MAX_AGE = int(os.getenv("SNAPSHOT_MAX_AGE", str(7 * 24 * 3600)))
+# Tamaño total máximo en disco; se eliminan primero los más antiguos
+SNAPSHOT_MAX_BYTES = int(os.getenv("SNAPSHOT_MAX_BYTES", str(200 * 1024 * 1024)))
+
+_lock = threading.Lock()
+_force_refresh = False
+
+
+def set_force_refresh(value):
+    """Ignorar los snapshots existentes (se vuelven a descargar y guardar)."""
+    global _force_refresh
+    _force_refresh = bool(value)
+
+
+def _digest(values):
+    payload = json.dumps(values, ensure_ascii=False, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def row_hash(row):
+    """Hash de una fila sin sus celdas vacías finales (marca de agua)."""
+    row = list(row)
+    while row and row[-1] == "":
+        row.pop()
+    return _digest(row)
+
+
+def prefix_hash(column_values, n_rows):
+    """Hash de los primeros `n_rows` valores de la columna de control
+    (celdas faltantes como vacías): detecta ediciones sobre la marca de agua.
+    """
+    values = [str(v) for v in column_values[:n_rows]]
+    values += [""] * (n_rows - len(values))
+    return _digest(values)
+
+
+def _snapshot_path(sheet_id, worksheet_name, columns):
+    key = json.dumps([sheet_id, worksheet_name, columns], ensure_ascii=False)
+    name = hashlib.sha1(key.encode("utf-8")).hexdigest()
+    return os.path.join(SNAPSHOT_DIR, f"{name}.json.gz")
+
+
+def load(sheet_id, worksheet_name, columns=None):
+    """Retornar el snapshot guardado como dict con `headers`, `rows`,
+    `modified` y `age`, o None si no existe, expiró o se forzó la descarga.
+    """
+    if not SNAPSHOT_ENABLED or _force_refresh:
+        return None
+
+    path = _snapshot_path(sheet_id, worksheet_name, columns)
+    try:
+        age = time.time() - os.path.getmtime(path)
+        if age > SNAPSHOT_MAX_AGE:
+            return None
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception:
+        logger.warning(f"Snapshot ilegible, se descarta: {path}")
+        return None
+
+    # los valores se guardan por columna
+    if data["columns"]:
+        rows = [list(r) for r in zip(*data["columns"])]
+    else:
+        rows = [[] for _ in range(data["n_rows"])]
+
+    return {
+        "headers": data["headers"],
+        "rows": rows,
+        "modified": data.get("modified"),
+        "age": age,
+        "first_row": data.get("first_row"),
+        "header_raw": data.get("header_raw"),
+        "letters": data.get("letters"),
+        "watermark": data.get("watermark"),
+    }
+
+
+def is_trusted(snap):
+    """Un snapshot reciente se usa aunque el spreadsheet haya cambiado."""
+    return snap["age"] <= SNAPSHOT_TRUST_SECONDS
+
+
+def save(sheet_id, worksheet_name, columns, headers, rows, modified,
+         first_row=None, header_raw=None, letters=None):
+    """Guardar `(headers, rows)` en formato columnar comprimido y aplicar
+    la política de expulsión. `modified` es el modifiedTime del spreadsheet
+    al momento de la lectura.
+
+    `first_row` (fila de la hoja donde empiezan los datos), `header_raw` y
+    `letters` (columnas proyectadas) permiten la lectura incremental: la
+    marca de agua es la última fila guardada, el hash de sus valores y el
+    hash de la columna de control (primera columna leída) en las filas
+    anteriores.
+    """
+    if not SNAPSHOT_ENABLED:
+        return
+
+    watermark = None
+    if first_row is not None and rows:
+        watermark = {
+            "row": first_row + len(rows) - 1,
+            "hash": row_hash(rows[-1]),
+            "prefix": prefix_hash(
+                [row[0] if row else "" for row in rows[:-1]], len(rows) - 1
+            ),
+        }
+
+    width = len(headers)
+    data = {
+        "sheet_id": sheet_id,
+        "worksheet": worksheet_name,
+        "columns_requested": columns,
+        "modified": modified,
+        "first_row": first_row,
+        "header_raw": header_raw,
+        "letters": letters,
+        "watermark": watermark,
+        "headers": headers,
+        "n_rows": len(rows),
+        "columns": [
+            [row[j] if j < len(row) else "" for row in rows]
+            for j in range(width)
+        ],
+    }
+
+    path = _snapshot_path(sheet_id, worksheet_name, columns)
+    try:
+        with atomic_open(path, compress=True) as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+    except Exception:
+        logger.exception(f"No se pudo guardar snapshot de '{worksheet_name}'")
+        return
+
+    evict()
+
+
+def evict():
+    """Eliminar snapshots expirados y, si se supera `SNAPSHOT_MAX_BYTES`,
+    los más antiguos primero.
+    """
+    with _lock:
+        try:
+            entries = [
+                os.path.join(SNAPSHOT_DIR, name)
+                for name in os.listdir(SNAPSHOT_DIR)
+                if name.endswith(".json.gz")
+            ]
+        except FileNotFoundError:
+            return
+
+        now = time.time()
+        files = []
+        for path in entries:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            if now - stat.st_mtime > SNAPSHOT_MAX_AGE:
+                _remove(path)
+            else:
+                files.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= SNAPSHOT_MAX_BYTES:
+                break
+            _remove(path)
+            total -= size
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+        logger.info(f"Snapshot eliminado: {os.path.basename(path)}")
+    except FileNotFoundError:
+        pass
+
+
+def touch(sheet_id, worksheet_name, columns=None):
+    """Renovar la antigüedad de un snapshot que sigue vigente."""
+    try:
+        os.utime(_snapshot_path(sheet_id, worksheet_name, columns))
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,172 @@
+import os
+
+# =========================
+# MÉTODOS DE PAGO
+# =========================
+# Cuenta canónica: (moneda, variantes tal como aparecen en las hojas).
+# Las variantes se comparan sin espacios extremos y en mayúsculas; un
+# método sin entrada conserva su texto y se carga en la moneda por defecto.
+# Cada fuente reconoce solo las cuentas de su lista `payment_methods`.
+# La moneda usa la misma comparación: "PAYPAL", "BANCO DE MEXICO" o
+# "banco de chile" toman USD/MXN/CLP en todas las hojas del instituto (las
+# transformaciones anteriores exigían el texto exacto y las cargaban en PEN).
+DEFAULT_CURRENCY = "PEN"
+
+PAYMENT_METHODS = {
+    "Banco de la Nación": ("PEN", ["BANCO DE LA NACIÓN"]),
+    "Scotiabank": ("PEN", ["SCOTIABANK"]),
+    "Interbank": ("PEN", ["INTERBANK"]),
+    "Yape": ("PEN", ["YAPE"]),
+    "Plin": ("PEN", ["PLIN"]),
+    "BBVA": ("PEN", ["BBVA"]),
+    "BCP": ("PEN", ["BCP"]),
+    "Tarjeta LINK": ("PEN", ["TARJETA LINK"]),
+    "En Efectivo": ("PEN", ["EN EFECTIVO"]),
+    "Paypal": ("USD", ["PAYPAL"]),
+    "Cuentas México": ("MXN", ["BANCO DE MÉXICO", "BANCO DE MEXICO"]),
+    "Cuentas Ecuador": ("USD", ["BANCO DE ECUADOR"]),
+    "Cuentas Colombia": ("PEN", ["BANCO DE COLOMBIA"]),
+    "Cuentas Chile": ("CLP", ["BANCO DE CHILE"]),
+    "Sin Especificar": ("PEN", ["OTROS"]),
+}
+
+# Cuentas de cada negocio: Peri Collection solo cobra en cuentas locales
+COLLECTION_ACCOUNTS = [
+    "Banco de la Nación", "Scotiabank", "Interbank", "Yape", "Plin", "BBVA",
+    "BCP", "Tarjeta LINK", "En Efectivo",
+]
+INSTITUTE_ACCOUNTS = [
+    "Banco de la Nación", "Scotiabank", "Interbank", "Yape", "Plin", "BBVA",
+    "BCP", "Tarjeta LINK", "Paypal", "Cuentas México", "Cuentas Ecuador",
+    "Cuentas Colombia", "Cuentas Chile", "Sin Especificar",
+]
+
+# =========================
+# REGISTRO DE FUENTES
+# =========================
+# Cada hoja de ventas se describe aquí; extract/transform/pipeline usan un
+# único motor genérico. Claves:
+#   name            identificador corto de la fuente
+#   title           nombre legible para los logs
+#   sheet_id_env    variables de entorno con el spreadsheet y la pestaña
+#   worksheet_env
+#   columns         columnas a proyectar al leer la hoja (nombres del DataFrame)
+#   date_column     columna de fecha: nombre exacto o lista de candidatos
+#   dayfirst        orden día/mes de las fechas en texto
+#   status          filtro opcional `(columna, valor)`
+#   metadata        columnas constantes agregadas al extraer
+#   amount_column, account_column, id_column
+#                   columnas de origen de amount, to_account e id_referenced
+#   business_id, category_id, description
+#                   valores fijos de la transacción
+#   currency        moneda fija, o None para tomarla del método de pago
+#                   (ver PAYMENT_METHODS)
+#   payment_methods cuentas de PAYMENT_METHODS que reconoce la fuente
+#   sample_rows     filas del sample de verificación tras transformar
+#   empty_message   aviso cuando el periodo no tiene registros
+# El orden de la lista es el orden de consolidación final.
+SOURCES = [
+    {
+        # HOJA 2 – ventas PI
+        "name": "PI",
+        "title": "VENTAS Peri Institute",
+        "sheet_id_env": "PROTO_INSTITUTE_ID",
+        "worksheet_env": "WORKSHEET_NAME_2",
+        "columns": ["FECHA_P", "MONTO_P", "METODO_P", "CODIGO_PAGO"],
+        "date_column": ["FECHA_P", "FECHA P", "fecha_p", "fecha_pago", "fecha"],
+        "dayfirst": True,
+        "status": None,
+        "metadata": {},
+        "amount_column": "MONTO_P",
+        "account_column": "METODO_P",
+        "id_column": "CODIGO_PAGO",
+        "business_id": "negocio2",
+        "category_id": 2,
+        "description": "Venta de cursos en vivo Peri Institute",
+        "currency": None,
+        "payment_methods": INSTITUTE_ACCOUNTS,
+        "sample_rows": 5,
+        "empty_message": "No hay ingresos este mes",
+    },
+    {
+        # HOJA 1 – VENTAS PC
+        "name": "PC",
+        "title": "VENTAS Peri Collection",
+        "sheet_id_env": "PERSYS_SHEET_ID",
+        "worksheet_env": "WORKSHEET_NAME_1",
+        "columns": ["Estado", "FechaEntrega", "TotalPedido", "MetodoPago", "IdPedido"],
+        "date_column": "FechaEntrega",
+        "dayfirst": False,
+        "status": ("Estado", "ENVIADO"),
+        "metadata": {"fuente": "sales"},
+        "amount_column": "TotalPedido",
+        "account_column": "MetodoPago",
+        "id_column": "IdPedido",
+        "business_id": "negocio1",
+        "category_id": 1,
+        "description": "Venta de vestidos Peri Collection",
+        "currency": "PEN",
+        "payment_methods": COLLECTION_ACCOUNTS,
+        "sample_rows": 5,
+        "empty_message": "No hay ventas este mes",
+    },
+    {
+        # HOJA 3 – ventas hoja antigua PI
+        "name": "PI2",
+        "title": "VENTAS Peri Institute 2",
+        "sheet_id_env": "Matricula_PI_ID",
+        "worksheet_env": "WORKSHEET_NAME_3",
+        "columns": ["col_2", "col_3", "col_4", "col_7"],
+        "date_column": "col_7",
+        "dayfirst": True,
+        "status": None,
+        "metadata": {},
+        "amount_column": "col_3",
+        "account_column": "col_4",
+        "id_column": "col_2",
+        "business_id": "negocio2",
+        "category_id": 2,
+        "description": "Venta de cursos en vivo Peri Institute (A)",
+        "currency": None,
+        "payment_methods": INSTITUTE_ACCOUNTS,
+        "sample_rows": 15,
+        "empty_message": "No hay ingresos este mes",
+    },
+    {
+        # HOJA 4 – ventas hoja matricula antigua PI
+        "name": "PI3",
+        "title": "VENTAS Peri Institute 3",
+        "sheet_id_env": "Matricula_PI_ID",
+        "worksheet_env": "WORKSHEET_NAME_4",
+        "columns": ["col_11", "col_22", "col_23", "col_24"],
+        "date_column": "col_23",
+        "dayfirst": True,
+        "status": None,
+        "metadata": {},
+        "amount_column": "col_22",
+        "account_column": "col_24",
+        "id_column": "col_11",
+        "business_id": "negocio2",
+        "category_id": 2,
+        "description": "Venta de cursos en vivo Peri Institute (A-M)",
+        "currency": None,
+        "payment_methods": INSTITUTE_ACCOUNTS,
+        "sample_rows": 15,
+        "empty_message": "No hay ingresos este mes",
+    },
+]
+
+_SOURCES_BY_NAME = {source["name"]: source for source in SOURCES}
+
+
+def get_source(name):
+    """Especificación registrada de una fuente por su nombre."""
+    try:
+        return _SOURCES_BY_NAME[name]
+    except KeyError:
+        raise KeyError(f"Fuente no registrada: {name}") from None
+
+
+def source_location(source):
+    """(sheet_id, worksheet_name) de la fuente según las variables de entorno."""
+    return os.getenv(source["sheet_id_env"]), os.getenv(source["worksheet_env"])
@@ -1,217 +1,166 @@
+import numpy as np
 import pandas as pd
-from logger import get_logger
+import metrics
+from logger import get_logger, log_preview
+from sources import DEFAULT_CURRENCY, PAYMENT_METHODS, SOURCES, get_source
 
 logger = get_logger("TRANSFORM")
 
-def transform_ventas_peri_collection(df):
-    logger.info("Transformando hoja de VENTAS Peri Collection")
-
-    if df.empty:
-        logger.warning("DataFrame vacío, no hay datos para transformar")
-        return df
-
-    # =========================
-    # NORMALIZADOR DE CUENTAS
-    # =========================
-    ACCOUNT_MAP = {
-        "BANCO DE LA NACIÓN": "Banco de la Nación",
-        "SCOTIABANK": "Scotiabank",
-        "INTERBANK": "Interbank",
-        "YAPE": "Yape",
-        "PLIN": "Plin",
-        "BBVA": "BBVA",
-        "BCP": "BCP",
-        "TARJETA LINK": "Tarjeta LINK",
-        "EN EFECTIVO": "En Efectivo"
-    }
 
-    def normalize_account(value):
-        if not value:
-            return None
+# =========================
+# NORMALIZADOR DE CUENTAS
+# =========================
+def _payment_key(value):
+    return str(value).strip().upper()
 
-        key = str(value).strip().upper()
-        return ACCOUNT_MAP.get(key, value.title())
 
-    # =========================
-    # TRANSFORMACIÓN
-    # =========================
-    df_transformed = pd.DataFrame({
-        "date": df["fecha"].dt.strftime("%Y-%m-%d"),
-        "type": "income",
-        "business_id": "negocio1",
-        "category_id": 1,
-        "amount": df["TotalPedido"].astype(float).round(2),
-        "description": "Venta de vestidos Peri Collection",
-        "reference": None,
-        "from_account": None,
-        "to_account": df.get("MetodoPago").apply(normalize_account),
-        "is_invoiced": False,
-        "id_referenced": df["IdPedido"].astype(str),
-        "currency": "PEN"
-    })
+# tablas precompiladas: variante normalizada -> cuenta canónica / moneda
+# (la cuenta canónica también se reconoce a sí misma)
+ACCOUNT_ALIASES = {}
+ACCOUNT_CURRENCIES = {}
+for _account, (_currency, _aliases) in PAYMENT_METHODS.items():
+    for _alias in [_account, *_aliases]:
+        ACCOUNT_ALIASES[_payment_key(_alias)] = _account
+        ACCOUNT_CURRENCIES[_payment_key(_alias)] = _currency
 
-    logger.info(
-        f"Registros transformados correctamente: {len(df_transformed)}"
+# variantes que reconoce cada fuente (su lista `payment_methods`)
+SOURCE_ACCOUNT_ALIASES = {
+    _source["name"]: {
+        key: account for key, account in ACCOUNT_ALIASES.items()
+        if account in _source["payment_methods"]
+    }
+    for _source in SOURCES
+}
+
+
+def normalize_payment_methods(values, source_name=None):
+    """Resolver la cuenta destino y la moneda de cada método de pago.
+
+    Cada valor distinto se resuelve una sola vez (factorize + `Series.map`)
+    y el resultado se expande por sus códigos. Los métodos sin entrada en
+    PAYMENT_METHODS (o fuera de las cuentas de la fuente `source_name`)
+    conservan su texto capitalizado, se cargan en la moneda por defecto y se
+    reportan; los vacíos quedan sin cuenta.
+    Retorna `(to_account, currency)` alineados con `values`.
+    """
+    values = pd.Series(values)
+    codes, uniques = pd.factorize(values)
+
+    raw = pd.Series(uniques, dtype=object).astype(str).str.strip()
+    keys = raw.str.upper()
+    accounts = keys.map(SOURCE_ACCOUNT_ALIASES.get(source_name, ACCOUNT_ALIASES))
+    currencies = (
+        keys.map(ACCOUNT_CURRENCIES).where(accounts.notna()).fillna(DEFAULT_CURRENCY)
     )
 
-    # =========================
-    # SAMPLE DE DATOS
-    # =========================
-    logger.info("Sample de registros transformados:")
-    logger.info(
-        "\n" + df_transformed.head(5).to_string(index=False)
+    blank = keys == ""
+    unmapped = accounts.isna() & ~blank
+    if unmapped.any():
+        counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+        detail = ", ".join(
+            f"'{raw[i]}' ({counts[i]})" for i in np.flatnonzero(unmapped)
+        )
+        logger.warning(
+            f"Métodos de pago sin mapear{f' en {source_name}' if source_name else ''}: "
+            f"{detail}. Se cargan con su texto y moneda {DEFAULT_CURRENCY}."
+        )
+
+    accounts = accounts.where(~unmapped, raw.str.title()).to_numpy(dtype=object)
+    accounts[blank.to_numpy()] = None
+
+    # el código -1 (celda vacía/NaN) toma el último elemento agregado
+    to_account = np.append(accounts, None)[codes]
+    currency = np.append(currencies.to_numpy(dtype=object), DEFAULT_CURRENCY)[codes]
+    return (
+        pd.Series(to_account, index=values.index, dtype=object),
+        pd.Series(currency, index=values.index, dtype=object),
     )
 
-    return df_transformed
-
-
-
-
-
-def transform_ventas_peri_institute(df):
-    logger.info("Transformando hoja de ventas Peri Institute")
-
-    if df.empty:
-        logger.warning("DataFrame vacío, no hay datos para transformar")
-        return df
-
-    # =========================
-    # NORMALIZADOR DE CUENTAS
-    # =========================
-    ACCOUNT_MAP = {
-    "BANCO DE LA NACIÓN": "Banco de la Nación",
-    "SCOTIABANK": "Scotiabank",
-    "INTERBANK": "Interbank",
-    "YAPE": "Yape",
-    "PLIN": "Plin",
-    "BBVA": "BBVA",
-    "BCP": "BCP",
-    "TARJETA LINK": "Tarjeta LINK",
-    "PAYPAL": "Paypal",
-    "BANCO DE MÉXICO": "Cuentas México",
-    "BANCO DE MEXICO": "Cuentas México",
-    "BANCO DE ECUADOR": "Cuentas Ecuador",
-    "BANCO DE COLOMBIA": "Cuentas Colombia",
-    "BANCO DE CHILE": "Cuentas Chile",
-    "OTROS": "Sin Especificar"
-    }
-
-
-    def normalize_account(value):
-        if not value:
-            return None
-
-        key = str(value).strip().upper()
-        return ACCOUNT_MAP.get(key, value.title())
-    
-        
-    def currency_fixed(value):
-        if value == "Banco de México" or value == "Banco de Mexico":
-            return "MXN"
-        elif value == "Banco de Ecuador":
-            return "USD"
-        elif value == "PayPal":
-            return "USD"
-        elif value == "Banco de Chile":
-            return "CLP"
-        else:
-            return "PEN"
-
-    
-
-    df_transformed = pd.DataFrame({
-        "date": df["fecha"].dt.strftime("%Y-%m-%d"),
-        "type": "income",
-        "business_id": "negocio2",
-        "category_id": 2,
-        "amount": df["MONTO_P"].astype(float).round(2),
-        "description": "Venta de cursos en vivo Peri Institute",
-        "reference": None,
-        "from_account": None,
-        "to_account": df.get("METODO_P").apply(normalize_account),
-        "is_invoiced": False,
-        "id_referenced": df["CODIGO_PAGO"].astype(str),
-        "currency": df["METODO_P"].apply(currency_fixed)
-    })
-    logger.info(
-        f"Registros transformados correctamente: {len(df_transformed)}"
-    )
 
-    # =========================
-    # SAMPLE DE DATOS
-    # =========================
-    logger.info("Sample de registros transformados:")
-    logger.info(
-        "\n" + df_transformed.head(5).to_string(index=False)
+# =========================
+# REPRESENTACIÓN COMPACTA
+# =========================
+def _constant(value, index):
+    """Columna constante como categórica de una sola categoría: ocupa un
+    byte por fila y el valor se expande recién al serializar la carga.
+    """
+    if value is None:
+        # sin categorías: todas las filas quedan como nulo
+        return pd.Series(
+            pd.Categorical.from_codes(np.full(len(index), -1, dtype=np.int8), categories=[]),
+            index=index
+        )
+    return pd.Series(
+        pd.Categorical.from_codes(np.zeros(len(index), dtype=np.int8), categories=[value]),
+        index=index
     )
 
-    return df_transformed
 
-def transform_ventas_peri_institute_2(df):
-    logger.info("Transformando hoja de ventas Peri Institute")
+def concat_frames(frames):
+    """Concatenar frames transformados conservando las columnas categóricas:
+    `pd.concat` las degrada a object si las categorías difieren, así que
+    antes se unifican las categorías de cada columna.
+    """
+    frames = [df for df in frames if not df.empty]
+    if not frames:
+        return pd.DataFrame()
+
+    frames = [df.copy(deep=False) for df in frames]
+    for column in frames[0].columns:
+        columns = [df[column] for df in frames if column in df.columns]
+        if not all(isinstance(c.dtype, pd.CategoricalDtype) for c in columns):
+            continue
+        categories = pd.Index(
+            pd.unique(np.concatenate([c.cat.categories.to_numpy(dtype=object) for c in columns]))
+        )
+        for df in frames:
+            if column in df.columns:
+                df[column] = df[column].cat.set_categories(categories)
+
+    return pd.concat(frames, ignore_index=True)
+
+
+def transform_source(df, source):
+    """Motor de transformación común a todas las fuentes registradas en
+    `sources.SOURCES`: arma las transacciones con las columnas y valores
+    fijos de la especificación de la fuente.
+    """
+    logger.info(f"Transformando hoja de {source['title']}")
 
     if df.empty:
         logger.warning("DataFrame vacío, no hay datos para transformar")
         return df
 
-    # =========================
-    # NORMALIZADOR DE CUENTAS
-    # =========================
-    ACCOUNT_MAP = {
-    "BANCO DE LA NACIÓN": "Banco de la Nación",
-    "SCOTIABANK": "Scotiabank",
-    "INTERBANK": "Interbank",
-    "YAPE": "Yape",
-    "PLIN": "Plin",
-    "BBVA": "BBVA",
-    "BCP": "BCP",
-    "TARJETA LINK": "Tarjeta LINK",
-    "PAYPAL": "Paypal",
-    "BANCO DE MÉXICO": "Cuentas México",
-    "BANCO DE MEXICO": "Cuentas México",
-    "BANCO DE ECUADOR": "Cuentas Ecuador",
-    "BANCO DE COLOMBIA": "Cuentas Colombia",
-    "BANCO DE CHILE": "Cuentas Chile",
-    "OTROS": "Sin Especificar"
-    }
+    with metrics.stage(source["name"], "transform", rows_in=len(df)) as m:
+        to_account, currency = normalize_payment_methods(
+            df[source["account_column"]], source["name"]
+        )
+
+        # =========================
+        # TRANSFORMACIÓN
+        # =========================
+        # constantes y valores de baja cardinalidad como categóricas; la fecha
+        # queda como datetime64 y se formatea al serializar
+        index = df.index
+        df_transformed = pd.DataFrame({
+            "date": df["fecha"].dt.normalize(),
+            "type": _constant("income", index),
+            "business_id": _constant(source["business_id"], index),
+            "category_id": _constant(source["category_id"], index),
+            "amount": df[source["amount_column"]].astype(float).round(2),
+            "description": _constant(source["description"], index),
+            "reference": _constant(None, index),
+            "from_account": _constant(None, index),
+            "to_account": to_account.astype("category"),
+            "is_invoiced": _constant(False, index),
+            "id_referenced": df[source["id_column"]].astype(str),
+            "currency": (
+                _constant(source["currency"], index) if source["currency"]
+                else currency.astype("category")
+            )
+        })
+        m.rows_out = len(df_transformed)
 
-
-    def normalize_account(value):
-        if not value:
-            return None
-
-        key = str(value).strip().upper()
-        return ACCOUNT_MAP.get(key, value.title())
-    def currency_fixed(value):
-        if None:
-            return "PEN"
-        elif value == "Banco de México" or value == "Banco de Mexico":
-            return "MXN"
-        elif value == "Banco de Ecuador":
-            return "USD"
-        elif value == "Paypal":
-            return "USD"
-        elif value == "Banco de Chile":
-            return "CLP"
-        else:
-            return "PEN"
-
-    
-
-    df_transformed = pd.DataFrame({
-        "date": df["fecha"].dt.strftime("%Y-%m-%d"),
-        "type": "income",
-        "business_id": "negocio2",
-        "category_id": 2,
-        "amount": df["col_3"].astype(float).round(2),
-        "description": "Venta de cursos en vivo Peri Institute (A)",
-        "reference": None,
-        "from_account": None,
-        "to_account": df.get("col_4").apply(normalize_account),
-        "is_invoiced": False,
-        "id_referenced": df["col_2"].astype(str),
-        "currency": df["col_4"].apply(currency_fixed)
-    })
     logger.info(
         f"Registros transformados correctamente: {len(df_transformed)}"
     )
@@ -219,89 +168,22 @@ def transform_ventas_peri_institute_2(df):
     # =========================
     # SAMPLE DE DATOS
     # =========================
-    logger.info("Sample de registros transformados:")
-    logger.info(
-        "\n" + df_transformed.head(15).to_string(index=False)
-    )
+    log_preview(logger, "Sample de registros transformados:", df_transformed, source["sample_rows"])
 
     return df_transformed
 
-def transform_ventas_peri_institute_3(df):
-    logger.info("Transformando hoja de ventas Peri Institute")
 
-    if df.empty:
-        logger.warning("DataFrame vacío, no hay datos para transformar")
-        return df
+def transform_ventas_peri_collection(df):
+    return transform_source(df, get_source("PC"))
 
-    # =========================
-    # NORMALIZADOR DE CUENTAS
-    # =========================
-    ACCOUNT_MAP = {
-    "BANCO DE LA NACIÓN": "Banco de la Nación",
-    "SCOTIABANK": "Scotiabank",
-    "INTERBANK": "Interbank",
-    "YAPE": "Yape",
-    "PLIN": "Plin",
-    "BBVA": "BBVA",
-    "BCP": "BCP",
-    "TARJETA LINK": "Tarjeta LINK",
-    "PAYPAL": "Paypal",
-    "BANCO DE MÉXICO": "Cuentas México",
-    "BANCO DE MEXICO": "Cuentas México",
-    "BANCO DE ECUADOR": "Cuentas Ecuador",
-    "BANCO DE COLOMBIA": "Cuentas Colombia",
-    "BANCO DE CHILE": "Cuentas Chile",
-    "OTROS": "Sin Especificar"
-    }
 
+def transform_ventas_peri_institute(df):
+    return transform_source(df, get_source("PI"))
 
-    def normalize_account(value):
-        if not value:
-            return None
-
-        key = str(value).strip().upper()
-        return ACCOUNT_MAP.get(key, value.title())
-    def currency_fixed(value):
-        if None:
-            return "PEN"
-        elif value == "Banco de México" or value == "Banco de Mexico":
-            return "MXN"
-        elif value == "Banco de Ecuador":
-            return "USD"
-        elif value == "Paypal":
-            return "USD"
-        elif value == "Banco de Chile":
-            return "CLP"
-        else:
-            return "PEN"
-
-    
-
-    df_transformed = pd.DataFrame({
-        "date": df["fecha"].dt.strftime("%Y-%m-%d"),
-        "type": "income",
-        "business_id": "negocio2",
-        "category_id": 2,
-        "amount": df["col_22"].astype(float).round(2),
-        "description": "Venta de cursos en vivo Peri Institute (A-M)",
-        "reference": None,
-        "from_account": None,
-        "to_account": df.get("col_24").apply(normalize_account),
-        "is_invoiced": False,
-        "id_referenced": df["col_11"].astype(str),
-        "currency": df["col_24"].apply(currency_fixed)
-    })
-    logger.info(
-        f"Registros transformados correctamente: {len(df_transformed)}"
-    )
 
-    # =========================
-    # SAMPLE DE DATOS
-    # =========================
-    logger.info("Sample de registros transformados:")
-    logger.info(
-        "\n" + df_transformed.head(15).to_string(index=False)
-    )
+def transform_ventas_peri_institute_2(df):
+    return transform_source(df, get_source("PI2"))
 
-    return df_transformed
 
+def transform_ventas_peri_institute_3(df):
+    return transform_source(df, get_source("PI3"))